@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
 from typing import List, Dict, Any, Optional
 from app.models.user import User
 from app.services.storage_service import StorageService
@@ -16,9 +16,19 @@ async def get_storage_files(
 
 @router.get("/missing", response_model=Dict[str, List[Dict[str, Any]]])
 async def get_missing_files(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     storage_service = StorageService(current_user.id)
+    
+    # Pollers send back the ETag; an unchanged list costs the small id/updated_at query only
+    etag = f'"{storage_service.get_missing_files_version()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
     return {"files": storage_service.get_missing_files()}
 
 @router.post("/upload/{file_id}", status_code=status.HTTP_200_OK)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Response, status
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, Any
 from app.models.user import User
 from app.services.whatsapp_service import WhatsAppService, supabase
+from app.services.file_service import FileService
 from app.utils.security import get_current_user
 from app.utils.logger import get_logger
 from uuid import UUID
@@ -14,7 +16,7 @@ async def create_session(current_user: User = Depends(get_current_user)):
     try:
         logger.info(f"Creating WhatsApp session for user {current_user.id} with phone unknown")
         whatsapp_service = WhatsAppService(current_user.id, supabase)  # Pass supabase
-        return whatsapp_service.initialize_session()
+        return await run_in_threadpool(whatsapp_service.initialize_session)
     except Exception as e:
         logger.error(f"Error creating WhatsApp session: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -27,22 +29,90 @@ async def check_session(
 ):
     try:
         whatsapp_service = WhatsAppService(current_user.id, supabase)  # Add supabase
-        result = whatsapp_service.check_session_status(session_id)
+        result = await run_in_threadpool(whatsapp_service.check_session_status, session_id)
         return result
     except Exception as e:
         logger.error(f"Error checking WhatsApp session: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+@router.get("/session/{session_id}/qr", status_code=status.HTTP_200_OK)
+async def get_session_qr(
+    session_id: UUID,
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        whatsapp_service = WhatsAppService(current_user.id, supabase)
+        qr_png = await run_in_threadpool(whatsapp_service.get_qr_image, session_id)
+    except Exception as e:
+        logger.error(f"Error getting WhatsApp QR code: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    
+    if qr_png is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No QR code is showing for this session")
+    
+    # Raw PNG for <img src>; each scan target is short-lived, so never cache it
+    return Response(content=qr_png, media_type="image/png", headers={"Cache-Control": "no-store"})
+
 @router.post("/download", status_code=status.HTTP_200_OK)
 async def download_files(current_user: User = Depends(get_current_user)):
     try:
         whatsapp_service = WhatsAppService(current_user.id, supabase)  # Add supabase
-        return {"files": whatsapp_service.download_files()}
+        return {"files": await run_in_threadpool(whatsapp_service.download_files)}
     except Exception as e:
         logger.error(f"Error downloading WhatsApp files: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+def _diagnose_cycle(user_id: UUID) -> Dict[str, Any]:
+    """
+    Run the sync diagnostic's check, download, sync and re-check steps in one request.
+    
+    WhatsApp is only scanned when nothing is pending, and sync only runs when something is,
+    matching the order the diagnostic script used to drive over five calls.
+    """
+    file_service = FileService(user_id)
+    pending = file_service.storage_service.get_missing_files()
+    state = {
+        "pending_before": len(pending),
+        "downloaded": None,
+        "pending_after_download": None,
+        "synced": None,
+        "pending_after": None
+    }
+    
+    if not pending:
+        try:
+            scan_result = WhatsAppService(user_id, supabase).download_files()
+            state["downloaded"] = len(scan_result.get("files", []))
+        except Exception as e:
+            logger.error(f"Error downloading WhatsApp files: {e}")
+            state["download_error"] = str(e)
+            return state
+        
+        pending = file_service.storage_service.get_missing_files()
+        state["pending_after_download"] = len(pending)
+        if not pending:
+            return state
+    
+    try:
+        state["synced"] = file_service.sync_missing_files()
+    except Exception as e:
+        logger.error(f"Error syncing files: {e}")
+        state["sync_error"] = str(e)
+        return state
+    
+    state["pending_after"] = len(file_service.storage_service.get_missing_files())
+    return state
+
+@router.post("/diagnose_cycle", status_code=status.HTTP_200_OK)
+async def diagnose_cycle(current_user: User = Depends(get_current_user)):
+    try:
+        logger.info(f"Running sync diagnostic cycle for user {current_user.id}")
+        return await run_in_threadpool(_diagnose_cycle, current_user.id)
+    except Exception as e:
+        logger.error(f"Error running sync diagnostic cycle: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
 @router.delete("/session/{session_id}", status_code=status.HTTP_200_OK)
 async def close_session(
     session_id: UUID,
@@ -50,7 +120,7 @@ async def close_session(
 ):
     try:
         whatsapp_service = WhatsAppService(current_user.id, supabase)  # Add supabase
-        whatsapp_service.close_session()
+        await run_in_threadpool(whatsapp_service.close_session, session_id)
         return {"message": "Session closed successfully"}
     except Exception as e:
         logger.error(f"Error closing WhatsApp session: {e}")
@@ -61,7 +131,7 @@ async def update_phone_numbers(current_user: User = Depends(get_current_user)):
     try:
         logger.info(f"Updating and organizing files by phone number for user {current_user.id}")
         whatsapp_service = WhatsAppService(current_user.id, supabase)
-        result = whatsapp_service.update_file_phone_numbers()
+        result = await run_in_threadpool(whatsapp_service.update_file_phone_numbers)
         return result
     except Exception as e:
         logger.error(f"Error updating phone numbers: {e}")
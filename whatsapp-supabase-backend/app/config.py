@@ -22,8 +22,13 @@ class Settings(BaseModel):
     supabase_url: str = os.getenv("SUPABASE_URL", "")
     supabase_key: str = os.getenv("SUPABASE_KEY", "")
     supabase_service_key: str = os.getenv("SUPABASE_SERVICE_KEY", "")  # Add this line
+    supabase_timeout: int = int(os.getenv("SUPABASE_TIMEOUT", "15"))  # Seconds per PostgREST request
+    supabase_storage_timeout: int = int(os.getenv("SUPABASE_STORAGE_TIMEOUT", "60"))  # Seconds per storage request
     
     # WhatsApp settings
     whatsapp_data_dir: str = os.getenv("WHATSAPP_DATA_DIR", "./whatsapp_data")
+    chromedriver_path: str = os.getenv("CHROMEDRIVER_PATH", "")  # Skips webdriver-manager when set
+    chrome_profile_cache_dir: str = os.getenv("CHROME_PROFILE_CACHE_DIR", "/dev/shm/whatsapp_profiles")  # Empty disables
+    chrome_profile_cache_max_mb: int = int(os.getenv("CHROME_PROFILE_CACHE_MAX_MB", "300"))
 
 settings = Settings()
\ No newline at end of file
@@ -1,9 +1,14 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from app.config import settings
 from app.api import auth, files, whatsapp, storage
+from app.services.whatsapp_authentication import prefetch_driver_path, shutdown_drivers
+from app.models.user import User
 from app.utils.security import get_current_user
+from app.utils.logger import tail_log, LOG_TAIL_BYTES
 
 
 app = FastAPI(
@@ -27,10 +32,30 @@ app.include_router(files.router, prefix="/api/files", tags=["Files"], dependenci
 app.include_router(whatsapp.router, prefix="/api/whatsapp", tags=["WhatsApp"], dependencies=[Depends(get_current_user)])
 app.include_router(storage.router, prefix="/api/storage", tags=["Storage"], dependencies=[Depends(get_current_user)])
 
+@app.on_event("startup")
+def resolve_chromedriver():
+    # The driver path is cached per process; resolve it now instead of on the first QR request
+    prefetch_driver_path()
+
+@app.on_event("shutdown")
+def close_whatsapp_drivers():
+    # close_session only parks drivers in the pool; quit them so no Chrome outlives the app
+    shutdown_drivers()
+
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "Welcome to WhatsApp to Supabase API"}
 
+@app.get("/api/logs", tags=["Diagnostics"], response_class=PlainTextResponse)
+async def read_logs(
+    max_bytes: int = Query(LOG_TAIL_BYTES, ge=1, le=LOG_TAIL_BYTES),
+    current_user: User = Depends(get_current_user)
+):
+    # The log covers every user's sessions, so only admins may read it
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return await run_in_threadpool(tail_log, max_bytes)
+
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
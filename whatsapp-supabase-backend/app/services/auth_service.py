@@ -5,11 +5,12 @@ from app.models.user import User, UserCreate, UserLogin, Token
 from app.utils.security import hash_password, verify_password, create_access_token
 from datetime import timedelta
 from app.config import settings
-from supabase import create_client, Client
+from supabase import Client
+from app.services.supabase_pool import get_supabase
 from app.utils.logger import get_logger
 
 logger = get_logger()
-supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
+supabase: Client = get_supabase()
 
 def register_user(user_data: UserCreate) -> User:
     """Register a new user."""
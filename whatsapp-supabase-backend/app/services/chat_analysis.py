@@ -1,13 +1,28 @@
 from datetime import datetime, timedelta
 import re
-from typing import Dict, Any, Optional
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
+from typing import Dict, Any
 
 from app.utils.logger import get_logger
+from app.services.phone_extraction import normalize_phone
 
 logger = get_logger()
 
+# A phone number shown as a chat title, e.g. "+91 98765 43210"
+_TITLE_PHONE_RE = re.compile(r'\+(\d[\d\s()-]*\d)')
+
+# Collects [title, timestamp] for every chat row in one WebDriver call; rows missing
+# either element come back as null, matching the old per-row find_element failures.
+# Rows are looked up under the #pane-side chat list only, not across the whole page.
+_CHAT_ROWS_SCRIPT = """
+const pane = document.getElementById("pane-side");
+if (!pane) return [];
+return Array.from(pane.querySelectorAll("div[role='row']"), row => {
+    const title = row.querySelector("span[data-testid='chat-title']");
+    const timestamp = row.querySelector("span[data-testid='chat-timestamp']");
+    return title && timestamp ? [title.innerText.trim(), timestamp.innerText.trim()] : null;
+});
+"""
+
 class ChatAnalyzer:
     """Analyzes WhatsApp chats and extracts relevant information."""
     
@@ -23,7 +38,8 @@ class ChatAnalyzer:
     def extract_active_chats(self) -> Dict[str, Any]:
         """
         Extract information about active chats from WhatsApp Web.
-        Returns a dict of phone numbers with last activity timestamps.
+        Returns a dict keyed by normalized (digits-only) phone number, or by chat title
+        when the title is a contact name, with last activity timestamps.
         """
         active_chats = {}
         
@@ -31,18 +47,16 @@ class ChatAnalyzer:
             return active_chats
         
         try:
-            # Find chat list
-            chat_list = self.driver.find_elements(By.CSS_SELECTOR, "div[role='row']")
+            # Read every chat row's title (phone number or name) and timestamp in the page
+            chat_rows = self.driver.execute_script(_CHAT_ROWS_SCRIPT) or []
             
-            for chat in chat_list:
+            for row in chat_rows:
+                if not row:
+                    logger.debug("Skipping chat row without a title or timestamp")
+                    continue
+                
                 try:
-                    # Get chat title (usually contains phone number or name)
-                    title_element = chat.find_element(By.CSS_SELECTOR, "span[data-testid='chat-title']")
-                    title = title_element.text.strip()
-                    
-                    # Try to extract timestamp
-                    timestamp_element = chat.find_element(By.CSS_SELECTOR, "span[data-testid='chat-timestamp']")
-                    timestamp_text = timestamp_element.text.strip()
+                    title, timestamp_text = row
                     
                     # Parse timestamp (simplified)
                     # Current time as fallback
@@ -55,9 +69,9 @@ class ChatAnalyzer:
                     elif "yesterday" in timestamp_text.lower():
                         chat_time = chat_time - timedelta(days=1)
                     
-                    # Extract phone number if possible
-                    phone_match = re.search(r'\+(\d+)', title)
-                    phone = phone_match.group(1) if phone_match else title
+                    # Extract phone number if possible, keyed once in the form file paths use
+                    phone_match = _TITLE_PHONE_RE.search(title)
+                    phone = normalize_phone(phone_match.group(1)) if phone_match else title
                     
                     active_chats[phone] = {
                         'title': title,
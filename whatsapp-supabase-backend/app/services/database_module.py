@@ -1,11 +1,36 @@
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Set, Iterator, NamedTuple
 from uuid import UUID
 
 from app.utils.logger import get_logger
 
 logger = get_logger()
 
+# Rows per PostgREST write request, and how many of those requests run at once
+DB_BATCH_SIZE = 500
+DB_WRITE_CONCURRENCY = 4
+
+class FileRow(NamedTuple):
+    """Compact, read-only view of the files columns used when reorganizing files."""
+    id: str
+    storage_path: str
+    filename: str
+    media_type: str
+    phone_number: str
+    organized_path: Optional[str]
+    
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> 'FileRow':
+        """Build a row from a PostgREST record; null columns fall back like missing ones."""
+        return cls(
+            id=record["id"],
+            storage_path=record.get("storage_path") or "",
+            filename=record.get("filename") or "",
+            media_type=record.get("media_type") or "other",
+            phone_number=record.get("phone_number") or "unknown",
+            organized_path=record.get("organized_path")
+        )
+
 class DatabaseManager:
     """Manages database operations for WhatsApp files and sessions."""
     
@@ -26,10 +51,10 @@ class DatabaseManager:
             logger.error(f"Error retrieving existing files: {str(e)}")
             return []
         
-    def add_files_to_database(self, files: List[Dict[str, Any]]) -> None:
-        """Add multiple files to database efficiently."""
+    def add_files_to_database(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add multiple files to database efficiently and return the inserted rows."""
         if not files:
-            return
+            return []
             
         # Prepare batch of records
         records = []
@@ -47,20 +72,78 @@ class DatabaseManager:
             }
             records.append(record)
         
-        # Insert in batches of 50 (to avoid large payloads)
-        batch_size = 50
-        for i in range(0, len(records), batch_size):
-            batch = records[i:i+batch_size]
+        # Insert in batches; each batch is one atomic PostgREST request, sent concurrently
+        inserted = []
+        for batch_rows in self._map_batches(self._insert_batch, records):
+            inserted.extend(batch_rows)
+        return inserted
+    
+    def _insert_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert one batch of records and return the inserted rows."""
+        try:
+            result = self.supabase.table("files").insert(batch).execute()
+            logger.info(f"Added batch of {len(batch)} files to database")
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Error adding batch to database: {str(e)}")
+            # Log the detailed structure of the record to diagnose issues
+            logger.error(f"Record structure: {list(batch[0].keys())}")
+            # The whole batch was rejected, so retry row by row to keep the good records
+            return self._insert_rows_individually(batch)
+    
+    def _map_batches(self, write_batch, rows: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Split rows into DB_BATCH_SIZE batches and write them, up to DB_WRITE_CONCURRENCY at a time.
+        
+        The Supabase client shares one HTTP connection pool across threads, so concurrent
+        batches cost about one round-trip of wall time instead of one per batch.
+        
+        Returns:
+            write_batch's results in batch order
+        """
+        batches = [rows[i:i + DB_BATCH_SIZE] for i in range(0, len(rows), DB_BATCH_SIZE)]
+        if len(batches) <= 1:
+            return [write_batch(batch) for batch in batches]
+        
+        with ThreadPoolExecutor(max_workers=min(DB_WRITE_CONCURRENCY, len(batches))) as executor:
+            return list(executor.map(write_batch, batches))
+    
+    def _insert_rows_individually(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert records one at a time, skipping the ones the database rejects."""
+        inserted = []
+        for record in records:
             try:
-                result = self.supabase.table("files").insert(batch).execute()
-                logger.info(f"Added batch of {len(batch)} files to database")
+                result = self.supabase.table("files").insert(record).execute()
+                inserted.extend(result.data or [])
             except Exception as e:
-                logger.error(f"Error adding batch to database: {str(e)}")
-                # Log the detailed structure of the record to diagnose issues
-                if batch:
-                    logger.error(f"Record structure: {list(batch[0].keys())}")
-        
+                logger.error(f"Error adding file {record.get('filename')} to database: {str(e)}")
+        logger.info(f"Added {len(inserted)} of {len(records)} files from failed batch individually")
+        return inserted
+    
+    def upsert_files(self, rows: List[Dict[str, Any]]) -> Set[str]:
+        """
+        Write partial file rows keyed by id in concurrent batches.
         
+        Args:
+            rows: Rows with an "id" plus the columns to set; all rows must share the same keys
+            
+        Returns:
+            IDs of the rows that were written
+        """
+        written = set()
+        for batch_ids in self._map_batches(self._upsert_batch, rows):
+            written.update(batch_ids)
+        return written
+    
+    def _upsert_batch(self, batch: List[Dict[str, Any]]) -> List[str]:
+        """Upsert one batch of partial rows and return the IDs written."""
+        try:
+            self.supabase.table("files").upsert(batch, on_conflict="id").execute()
+            logger.info(f"Updated batch of {len(batch)} files in database")
+            return [row["id"] for row in batch]
+        except Exception as e:
+            logger.error(f"Error updating batch of files: {str(e)}")
+            return []
     
     def get_files(self, filter_criteria: Dict[str, Any] = None, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
         """
@@ -116,6 +199,40 @@ class DatabaseManager:
                 "error": str(e)
             }
     
+    def iter_files(self, filter_criteria: Dict[str, Any] = None, page_size: int = 200) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield pages of WhatsApp files until every matching file has been returned.
+        
+        Args:
+            filter_criteria: Optional dictionary with filter criteria (e.g., uploaded, media_type)
+            page_size: Number of files fetched per request
+            
+        Yields:
+            Lists of file records, one page at a time
+        """
+        # Keyset paging on id: rows from one batch insert share a created_at, and callers may
+        # update rows out of the filter mid-scan, either of which shifts OFFSET pages
+        last_id = None
+        while True:
+            try:
+                query = self.supabase.table("files").select("*").eq("user_id", str(self.user_id))
+                for key, value in (filter_criteria or {}).items():
+                    query = query.eq(key, value)
+                if last_id is not None:
+                    query = query.gt("id", last_id)
+                
+                result = query.order("id").limit(page_size).execute()
+            except Exception as e:
+                logger.error(f"Error retrieving files: {str(e)}")
+                return
+            
+            files = result.data if result.data else []
+            if files:
+                yield files
+            if len(files) < page_size:
+                break
+            last_id = files[-1]["id"]
+    
     def get_file_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the user's WhatsApp files.
@@ -0,0 +1,155 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.common.exceptions import WebDriverException
+
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+# Released drivers kept warm; beyond this the least recently released one is quit
+DRIVER_POOL_MAX_IDLE = 8
+
+# Sessions a driver serves before it is recycled; WhatsApp Web's tab grows over long uptimes
+DRIVER_MAX_USES = 50
+
+class DriverPool:
+    """
+    Keeps Chrome drivers alive between requests, one per profile directory.
+
+    Chrome cannot open a user-data-dir twice and the profile holds that user's
+    WhatsApp login, so drivers are keyed by data_dir rather than shared.
+    """
+
+    def __init__(self, factory: Callable[[str], WebDriver], max_idle: int = DRIVER_POOL_MAX_IDLE,
+                 max_uses: int = DRIVER_MAX_USES, on_quit: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            factory: Starts a new driver for a profile directory
+            max_idle: Maximum number of released drivers kept open
+            max_uses: Releases after which a driver is quit instead of parked
+            on_quit: Called with a profile directory once its driver has quit
+        """
+        self._factory = factory
+        self._on_quit = on_quit
+        self._max_idle = max_idle
+        self._max_uses = max_uses
+        self._active: Dict[str, WebDriver] = {}
+        self._idle: "OrderedDict[str, WebDriver]" = OrderedDict()
+        self._uses: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, data_dir: str) -> WebDriver:
+        """
+        Return the live driver for a profile, starting one if needed.
+
+        Callers serialize acquire per data_dir, so at most one driver is started per profile.
+        """
+        with self._lock:
+            driver = self._active.get(data_dir) or self._idle.pop(data_dir, None)
+
+        if driver is not None:
+            if self._is_alive(driver):
+                with self._lock:
+                    self._active[data_dir] = driver
+                return driver
+            logger.warning(f"Discarding dead Chrome driver for {data_dir}")
+            with self._lock:
+                if self._active.get(data_dir) is driver:
+                    del self._active[data_dir]
+            self._quit(data_dir, driver)
+
+        driver = self._factory(data_dir)
+        with self._lock:
+            self._active[data_dir] = driver
+            self._uses[data_dir] = 0
+        return driver
+
+    def discard(self, data_dir: str, driver: Optional[WebDriver] = None):
+        """Quit the profile's driver now instead of parking it; the next acquire starts a new one."""
+        with self._lock:
+            active = self._active.pop(data_dir, None)
+            self._uses.pop(data_dir, None)
+        driver = driver or active
+        if driver is not None:
+            logger.info(f"Quitting Chrome driver for {data_dir}")
+            self._quit(data_dir, driver)
+
+    def release(self, data_dir: str, driver: Optional[WebDriver] = None):
+        """
+        Park the profile's driver on a blank page for reuse by its next session.
+
+        Cookies are left alone: the profile is the user's own WhatsApp login.
+        """
+        with self._lock:
+            active = self._active.pop(data_dir, None)
+        driver = driver or active
+        if driver is None:
+            return
+
+        with self._lock:
+            uses = self._uses[data_dir] = self._uses.get(data_dir, 0) + 1
+            if uses >= self._max_uses:
+                del self._uses[data_dir]
+        if uses >= self._max_uses:
+            logger.info(f"Recycling Chrome driver for {data_dir} after {uses} sessions")
+            self._quit(data_dir, driver)
+            return
+
+        try:
+            driver.get("about:blank")
+        except WebDriverException as e:
+            logger.warning(f"Could not reset Chrome driver for {data_dir}, quitting it: {e}")
+            self._quit(data_dir, driver)
+            return
+
+        with self._lock:
+            self._idle[data_dir] = driver
+            self._idle.move_to_end(data_dir)
+            evicted = []
+            while len(self._idle) > self._max_idle:
+                evicted.append(self._idle.popitem(last=False))
+
+        for stale_dir, stale in evicted:
+            self._quit(stale_dir, stale)
+
+    def close_all(self) -> List[str]:
+        """
+        Quit every pooled driver, active or idle, and return their profile directories.
+
+        Quits run in parallel since each one waits for Chrome to flush and exit.
+        """
+        with self._lock:
+            drivers = list(self._active.items()) + list(self._idle.items())
+            self._active.clear()
+            self._idle.clear()
+            self._uses.clear()
+
+        if drivers:
+            with ThreadPoolExecutor(max_workers=4, thread_name_prefix="chrome-teardown") as executor:
+                list(executor.map(self._quit, *zip(*drivers)))
+        return [data_dir for data_dir, _ in drivers]
+
+    @staticmethod
+    def _is_alive(driver: WebDriver) -> bool:
+        """Cheap round-trip to the browser, like a connection pool pre-ping."""
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def _quit(self, data_dir: str, driver: WebDriver):
+        """Quit a driver, logging instead of raising, then run the on_quit hook for its profile."""
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.error(f"Error closing WebDriver: {e}")
+
+        if self._on_quit:
+            try:
+                self._on_quit(data_dir)
+            except Exception as e:
+                logger.error(f"Error after closing WebDriver for {data_dir}: {e}")
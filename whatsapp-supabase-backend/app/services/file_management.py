@@ -1,15 +1,117 @@
 import os
+import re
 import hashlib
+import threading
 import platform
 import mimetypes
 from datetime import datetime
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 
 from app.utils.logger import get_logger
+from app.utils.filesystem import ensure_dir
 from app.services.phone_extraction import PhoneExtractor
 
 logger = get_logger()
 
+# File type mappings
+_FILE_TYPE_MAPPINGS = {
+    # Images
+    'image': ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff', '.heic'],
+    # Documents
+    'document': ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt', 
+                '.csv', '.rtf', '.odt', '.ods', '.odp', '.pages', '.numbers', '.key'],
+    # Audio
+    'audio': ['.mp3', '.wav', '.ogg', '.m4a', '.aac', '.flac', '.opus', '.amr'],
+    # Video
+    'video': ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp'],
+    # Archives
+    'archive': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'],
+}
+
+# Extension -> media type, so a scanned file is classified with one dict lookup
+_EXT_TO_TYPE = {ext: type_name for type_name, exts in _FILE_TYPE_MAPPINGS.items() for ext in exts}
+
+# WhatsApp specific file patterns, matched case-insensitively in a single pass over the name
+_WHATSAPP_PATTERNS = [
+    'WhatsApp Image', 'WhatsApp Video', 'WhatsApp Audio', 'WhatsApp Document',
+    'WA', 'IMG-', 'VID-', 'AUD-', 'DOC-', 'PTT-'
+]
+_WHATSAPP_PATTERN_RE = re.compile("|".join(re.escape(pattern.lower()) for pattern in _WHATSAPP_PATTERNS))
+
+def _media_type(file_lower: str) -> Optional[str]:
+    """Media type for a lowercased filename, or None if its extension is not a known media type."""
+    return _EXT_TO_TYPE.get(os.path.splitext(file_lower)[1])
+
+# Media roots scanned at once
+SCAN_WORKERS = 4
+
+def _new_scan_stats() -> Dict[str, Any]:
+    """Empty statistics for a scan or for one of its roots."""
+    return {
+        "images": 0,
+        "documents": 0,
+        "audio": 0,
+        "video": 0,
+        "other": 0,
+        "total_size": 0,
+        "error_count": 0,
+        "duplicate_count": 0,
+        "phone_numbers": {}  # Track files per phone number
+    }
+
+def _merge_scan_stats(total: Dict[str, Any], part: Dict[str, Any]):
+    """Add one root's statistics into the scan totals."""
+    for key, value in part.items():
+        if key != "phone_numbers":
+            total[key] += value
+    for phone, phone_stats in part["phone_numbers"].items():
+        merged = total["phone_numbers"].setdefault(phone, {
+            "count": 0,
+            "size": 0,
+            "types": {"image": 0, "video": 0, "audio": 0, "document": 0, "other": 0}
+        })
+        merged["count"] += phone_stats["count"]
+        merged["size"] += phone_stats["size"]
+        for type_name, count in phone_stats["types"].items():
+            merged["types"][type_name] += count
+
+def _distinct_roots(paths: List[str]) -> List[str]:
+    """
+    Canonicalize scan roots and drop repeats and roots nested inside another root.
+    
+    The primary media path and the per-user one are the same directory on the owner's Mac,
+    and a symlinked home can make different spellings point at one tree.
+    """
+    roots = []
+    for path in sorted({os.path.realpath(path) for path in paths}, key=len):
+        if not any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots):
+            roots.append(path)
+    return roots
+
+def _iter_files(root: str) -> Iterator[os.DirEntry]:
+    """
+    Yield every file under root in os.walk's top-down order, without following directory symlinks.
+    
+    Entries come from os.scandir, so their type checks and stat() reuse what the directory
+    listing already returned instead of issuing a syscall per question.
+    """
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except OSError as e:
+            # Like os.walk, skip directories that cannot be listed
+            logger.debug(f"Cannot list directory {directory}: {e}")
+        pending.extend(reversed(subdirs))
+
 class FileManager:
     """Manages WhatsApp file operations including scanning, hashing, and organizing."""
     
@@ -21,8 +123,8 @@ class FileManager:
         # Create necessary directories
         self.downloads_dir = os.path.join(data_dir, "downloads")
         self.organized_dir = os.path.join(data_dir, "organized_by_phone")
-        os.makedirs(self.downloads_dir, exist_ok=True)
-        os.makedirs(self.organized_dir, exist_ok=True)
+        ensure_dir(self.downloads_dir)
+        ensure_dir(self.organized_dir)
     
     def get_whatsapp_media_paths(self) -> List[str]:
         """Return platform-specific WhatsApp media paths."""
@@ -74,93 +176,57 @@ class FileManager:
             media_type: The type of media (image, video, audio, document)
             
         Returns:
-            The new organized file path, or None if organization failed
+            The new organized file path, or None if the file has no phone number
+            
+        Raises:
+            OSError: If the directory or the copy could not be created; batch callers count these
         """
+        # Called once per file during scans and phone-number updates, so per-file logs stay at debug
         if not phone_number or phone_number == "unknown":
-            logger.warning(f"Cannot organize file without phone number: {original_path}")
+            logger.debug(f"Cannot organize file without phone number: {original_path}")
             return None
             
-        try:
-            # Create base directory for organized files
-            organized_base = os.path.join(self.data_dir, "organized")
-            os.makedirs(organized_base, exist_ok=True)
-            
-            # Create directory for this phone number
-            phone_dir = os.path.join(organized_base, phone_number)
-            os.makedirs(phone_dir, exist_ok=True)
-            
-            # Create directory for this media type within the phone directory
-            media_dir = os.path.join(phone_dir, media_type)
-            os.makedirs(media_dir, exist_ok=True)
-            
-            # Determine the destination path
-            dest_path = os.path.join(media_dir, filename)
-            
-            # Check if the file already exists at the destination
-            if os.path.exists(dest_path):
-                logger.info(f"File already exists at destination: {dest_path}")
-                return dest_path
-                
-            # Copy the file (don't move, to keep the original)
-            import shutil
-            shutil.copy2(original_path, dest_path)
-            logger.info(f"Organized file to: {dest_path}")
-            
+        # Create organized/<phone_number>/<media_type>, parents included
+        media_dir = os.path.join(self.data_dir, "organized", phone_number, media_type)
+        ensure_dir(media_dir)
+        
+        # Determine the destination path
+        dest_path = os.path.join(media_dir, filename)
+        
+        # Check if the file already exists at the destination
+        if os.path.exists(dest_path):
+            logger.debug(f"File already exists at destination: {dest_path}")
             return dest_path
-        except Exception as e:
-            logger.error(f"Error organizing file {original_path}: {str(e)}")
-            return None
             
-    def scan_whatsapp_files(self, active_chats: Dict[str, Any]) -> Dict[str, Any]:
+        # Copy the file (don't move, to keep the original)
+        import shutil
+        shutil.copy2(original_path, dest_path)
+        logger.debug(f"Organized file to: {dest_path}")
+        
+        return dest_path
+            
+    def scan_whatsapp_files(self, active_chats: Dict[str, Any],
+                            on_file: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Scan directories for WhatsApp files.
         
         Args:
-            active_chats: Dictionary of active chats with timestamps
+            active_chats: Active chats keyed by normalized (digits-only) phone number, or by
+                          title for named contacts, each with a last_activity timestamp
+            on_file: Optional callback receiving each new file as soon as it is found
             
         Returns:
             Dictionary with scan results including files and statistics
         """
         # Placeholder for downloaded files
         downloaded_files = []
-        stats = {
-            "images": 0,
-            "documents": 0,
-            "audio": 0,
-            "video": 0,
-            "other": 0,
-            "total_size": 0,
-            "error_count": 0,
-            "duplicate_count": 0,
-            "phone_numbers": {}  # Track files per phone number
-        }
-        
-        # File type mappings
-        file_type_mappings = {
-            # Images
-            'image': ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff', '.heic'],
-            # Documents
-            'document': ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt', 
-                        '.csv', '.rtf', '.odt', '.ods', '.odp', '.pages', '.numbers', '.key'],
-            # Audio
-            'audio': ['.mp3', '.wav', '.ogg', '.m4a', '.aac', '.flac', '.opus', '.amr'],
-            # Video
-            'video': ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp'],
-            # Archives
-            'archive': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'],
-        }
-        
-        # Flatten for extension checking
-        all_extensions = [ext for exts in file_type_mappings.values() for ext in exts]
         
-        # WhatsApp specific file patterns
-        whatsapp_patterns = [
-            'WhatsApp Image', 'WhatsApp Video', 'WhatsApp Audio', 'WhatsApp Document',
-            'WA', 'IMG-', 'VID-', 'AUD-', 'DOC-', 'PTT-'
-        ]
+        # (filename, size) of every file found so far, for the duplicate check
+        seen_files = set()
+        stats = _new_scan_stats()
         
-        # Get media paths to scan
-        possible_paths = self.get_whatsapp_media_paths()
+        # Get media paths to scan, each directory tree only once
+        possible_paths = _distinct_roots(self.get_whatsapp_media_paths())
         
         # Log all potential paths
         for path in possible_paths:
@@ -169,7 +235,7 @@ class FileManager:
             logger.info(f"Will scan directory: {path} (exists: {exists}, readable: {readable})")
         
         # Scan all potential directories
-        paths_scanned = 0
+        scan_roots = []
         
         for base_path in possible_paths:
             # Skip paths that don't exist
@@ -183,134 +249,27 @@ class FileManager:
                 continue
                 
             logger.info(f"Scanning directory: {base_path}")
-            paths_scanned += 1
             
-            # Take a snapshot of the directory structure for debugging
-            dir_structure = []
-            try:
-                # Only list top-level directories to avoid excessive logging
-                dir_structure = os.listdir(base_path)
-                logger.debug(f"Directory structure: {', '.join(dir_structure[:10])}" + 
-                            (f" and {len(dir_structure) - 10} more..." if len(dir_structure) > 10 else ""))
-            except Exception as e:
-                logger.error(f"Error listing directory structure: {str(e)}")
-            
-            # Walk through all directories and files
-            try:
-                file_count = 0
-                for root, dirs, files in os.walk(base_path):
-                    # Log progress periodically
-                    if file_count > 0 and file_count % 100 == 0:
-                        logger.info(f"Processed {file_count} files so far in {base_path}")
-                    
-                    for file in files:
-                        file_count += 1
-                        file_path = os.path.join(root, file)
-                        
-                        # Skip system files and non-media files
-                        file_lower = file.lower()
-                        
-                        # Skip hidden files
-                        if file.startswith('.'):
-                            continue
-                        
-                        # Check if it's likely a WhatsApp file either by extension or pattern
-                        is_valid_extension = any(file_lower.endswith(ext) for ext in all_extensions)
-                        is_whatsapp_pattern = any(pattern.lower() in file_lower for pattern in whatsapp_patterns)
-                        
-                        if not (is_valid_extension or is_whatsapp_pattern):
-                            continue
-                        
-                        logger.debug(f"Found potential WhatsApp file: {file}")
-                        
-                        try:
-                            # Get file size and creation time
-                            file_size = os.path.getsize(file_path)
-                            
-                            # Use creation time or modification time, whichever is more recent
-                            file_ctime = os.path.getctime(file_path)
-                            file_mtime = os.path.getmtime(file_path)
-                            file_time = max(file_ctime, file_mtime)
-                            file_date = datetime.fromtimestamp(file_time)
-                            
-                            # Try to determine mime type
-                            mime_type, _ = mimetypes.guess_type(file_path)
-                            if not mime_type:
-                                # Use a default based on extension
-                                mime_type = "application/octet-stream"
-                            
-                            # Determine media type
-                            media_type = 'other'
-                            for type_name, extensions in file_type_mappings.items():
-                                if any(file_lower.endswith(ext) for ext in extensions):
-                                    media_type = type_name
-                                    break
-                            
-                            # Try to determine phone number from filename or match with active chats
-                            phone_number = self.phone_extractor.extract_phone_number(file_path, file_date, active_chats)
-
-                            
-                            # Calculate file hash for deduplication
-                            file_hash = self.calculate_file_hash(file_path)
-                            
-                            # Stats tracking
-                            stats[media_type if media_type in stats else 'other'] += 1
-                            stats['total_size'] += file_size
-                            
-                            # Check for duplicates
-                            is_duplicate = False
-                            for existing_file in downloaded_files:
-                                if (existing_file["filename"] == file and 
-                                    existing_file["size"] == file_size):
-                                    is_duplicate = True
-                                    stats['duplicate_count'] += 1
-                                    break
-                                    
-                            if is_duplicate:
-                                continue
-                            
-                            # Try to organize file by phone number
-                            organized_path = self.organize_file_by_phone(file_path, file, phone_number, media_type)
-                                
-                            file_info = {
-                                "filename": file,
-                                "local_path": file_path,
-                                "organized_path": organized_path,
-                                "phone_number": phone_number,
-                                "size": file_size,
-                                "mime_type": mime_type,
-                                "media_type": media_type,
-                                "created_at": file_date.isoformat(),
-                                "source_dir": base_path,
-                                "file_hash": file_hash
-                            }
-                            
-                            # Track files by phone number for stats
-                            if phone_number not in stats["phone_numbers"]:
-                                stats["phone_numbers"][phone_number] = {
-                                    "count": 0,
-                                    "size": 0,
-                                    "types": {"image": 0, "video": 0, "audio": 0, "document": 0, "other": 0}
-                                }
-                            
-                            stats["phone_numbers"][phone_number]["count"] += 1
-                            stats["phone_numbers"][phone_number]["size"] += file_size
-                            stats["phone_numbers"][phone_number]["types"][media_type if media_type in stats["phone_numbers"][phone_number]["types"] else "other"] += 1
-                            
-                            downloaded_files.append(file_info)
-                            
-                        except PermissionError:
-                            logger.warning(f"Permission denied accessing file: {file_path}")
-                            stats['error_count'] += 1
-                        except Exception as e:
-                            logger.error(f"Error processing file {file_path}: {str(e)}")
-                            stats['error_count'] += 1
-                            
-            except PermissionError:
-                logger.error(f"Permission denied when accessing directory: {base_path}")
-            except Exception as e:
-                logger.error(f"Error scanning directory {base_path}: {str(e)}")
-        
+            # Queue the root; roots are scanned below, in parallel when there are several
+            scan_roots.append(base_path)
+        
+        # Each root is walked on its own thread: the work is stat, read and copy syscalls, which
+        # release the GIL. Stats are accumulated per root and merged in root order.
+        seen_lock = threading.Lock()
+        if len(scan_roots) > 1:
+            with ThreadPoolExecutor(max_workers=min(SCAN_WORKERS, len(scan_roots))) as executor:
+                results = list(executor.map(
+                    lambda root: self._scan_root(root, active_chats, on_file, seen_files, seen_lock),
+                    scan_roots
+                ))
+        else:
+            results = [self._scan_root(root, active_chats, on_file, seen_files, seen_lock) for root in scan_roots]
+        
+        for root_files, root_stats in results:
+            downloaded_files.extend(root_files)
+            _merge_scan_stats(stats, root_stats)
+        
+        paths_scanned = len(scan_roots)
         if paths_scanned == 0:
             logger.warning("No WhatsApp media directories were accessible for scanning")
             
@@ -334,6 +293,149 @@ class FileManager:
             "paths_scanned": paths_scanned
         }
         
+    def _scan_root(self, base_path: str, active_chats: Dict[str, Any],
+                   on_file: Optional[Callable[[Dict[str, Any]], None]],
+                   seen_files: set, seen_lock: threading.Lock) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Scan one media directory tree.
+        
+        Args:
+            base_path: Existing, readable directory to walk
+            active_chats: Active chats used for phone number matching
+            on_file: Optional callback receiving each new file as soon as it is found
+            seen_files: (filename, size) pairs already found in any root, updated under seen_lock
+            seen_lock: Lock guarding seen_files
+            
+        Returns:
+            The new files found under base_path and this tree's statistics
+        """
+        downloaded_files = []
+        stats = _new_scan_stats()
+        
+        # Take a snapshot of the directory structure for debugging
+        dir_structure = []
+        try:
+            # Only list top-level directories to avoid excessive logging
+            dir_structure = os.listdir(base_path)
+            logger.debug(f"Directory structure: {', '.join(dir_structure[:10])}" + 
+                        (f" and {len(dir_structure) - 10} more..." if len(dir_structure) > 10 else ""))
+        except Exception as e:
+            logger.error(f"Error listing directory structure: {str(e)}")
+        
+        # Walk through all directories and files
+        try:
+            file_count = 0
+            for entry in _iter_files(base_path):
+                file_count += 1
+                
+                # Log progress periodically
+                if file_count % 100 == 0:
+                    logger.info(f"Processed {file_count} files so far in {base_path}")
+                
+                file = entry.name
+                file_path = entry.path
+                
+                # Skip system files and non-media files
+                file_lower = file.lower()
+                
+                # Skip hidden files
+                if file.startswith('.'):
+                    continue
+                
+                # Check if it's likely a WhatsApp file either by extension or pattern
+                known_type = _media_type(file_lower)
+                if known_type is None and not _WHATSAPP_PATTERN_RE.search(file_lower):
+                    continue
+                
+                logger.debug(f"Found potential WhatsApp file: {file}")
+                
+                try:
+                    # Get file size and creation time from one stat, cached on the entry
+                    file_stat = entry.stat()
+                    file_size = file_stat.st_size
+                    
+                    # Use creation time or modification time, whichever is more recent
+                    file_time = max(file_stat.st_ctime, file_stat.st_mtime)
+                    file_date = datetime.fromtimestamp(file_time)
+                    
+                    # Try to determine mime type
+                    mime_type, _ = mimetypes.guess_type(file_path)
+                    if not mime_type:
+                        # Use a default based on extension
+                        mime_type = "application/octet-stream"
+                    
+                    # Determine media type
+                    media_type = known_type or 'other'
+                    
+                    # Stats tracking
+                    stats[media_type if media_type in stats else 'other'] += 1
+                    stats['total_size'] += file_size
+                    
+                    # Check for duplicates before the phone lookup and hashing, which only new files need;
+                    # the set is shared by every root being scanned
+                    with seen_lock:
+                        is_duplicate = (file, file_size) in seen_files
+                        seen_files.add((file, file_size))
+                    if is_duplicate:
+                        stats['duplicate_count'] += 1
+                        continue
+                    
+                    # Try to determine phone number from filename or match with active chats
+                    phone_number = self.phone_extractor.extract_phone_number(file_path, file_date, active_chats)
+                    
+                    # Calculate file hash for deduplication
+                    file_hash = self.calculate_file_hash(file_path)
+                    
+                    # Try to organize file by phone number; the file is still recorded if that fails
+                    try:
+                        organized_path = self.organize_file_by_phone(file_path, file, phone_number, media_type)
+                    except OSError as e:
+                        logger.warning(f"Error organizing file {file_path}: {str(e)}")
+                        organized_path = None
+                        
+                    file_info = {
+                        "filename": file,
+                        "local_path": file_path,
+                        "organized_path": organized_path,
+                        "phone_number": phone_number,
+                        "size": file_size,
+                        "mime_type": mime_type,
+                        "media_type": media_type,
+                        "created_at": file_date.isoformat(),
+                        "source_dir": base_path,
+                        "file_hash": file_hash
+                    }
+                    
+                    # Track files by phone number for stats
+                    if phone_number not in stats["phone_numbers"]:
+                        stats["phone_numbers"][phone_number] = {
+                            "count": 0,
+                            "size": 0,
+                            "types": {"image": 0, "video": 0, "audio": 0, "document": 0, "other": 0}
+                        }
+                    
+                    stats["phone_numbers"][phone_number]["count"] += 1
+                    stats["phone_numbers"][phone_number]["size"] += file_size
+                    stats["phone_numbers"][phone_number]["types"][media_type if media_type in stats["phone_numbers"][phone_number]["types"] else "other"] += 1
+                    
+                    downloaded_files.append(file_info)
+                    if on_file:
+                        on_file(file_info)
+                    
+                except PermissionError:
+                    logger.warning(f"Permission denied accessing file: {file_path}")
+                    stats['error_count'] += 1
+                except Exception as e:
+                    logger.error(f"Error processing file {file_path}: {str(e)}")
+                    stats['error_count'] += 1
+                    
+        except PermissionError:
+            logger.error(f"Permission denied when accessing directory: {base_path}")
+        except Exception as e:
+            logger.error(f"Error scanning directory {base_path}: {str(e)}")
+        
+        return downloaded_files, stats
+
     def copy_file_to_downloads(self, file_path: str, filename: str) -> str:
         """
         Copy a file to the downloads directory.
@@ -376,27 +478,7 @@ class FileManager:
         Returns:
             Media type category
         """
-        # File type mappings
-        file_type_mappings = {
-            # Images
-            'image': ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff', '.heic'],
-            # Documents
-            'document': ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt', 
-                        '.csv', '.rtf', '.odt', '.ods', '.odp', '.pages', '.numbers', '.key'],
-            # Audio
-            'audio': ['.mp3', '.wav', '.ogg', '.m4a', '.aac', '.flac', '.opus', '.amr'],
-            # Video
-            'video': ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp'],
-            # Archives
-            'archive': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'],
-        }
-        
-        file_lower = filename.lower()
-        for type_name, extensions in file_type_mappings.items():
-            if any(file_lower.endswith(ext) for ext in extensions):
-                return type_name
-        
-        return 'other'
+        return _media_type(filename.lower()) or 'other'
     
     def is_whatsapp_file(self, filename: str) -> bool:
         """
@@ -408,36 +490,10 @@ class FileManager:
         Returns:
             True if likely a WhatsApp file, False otherwise
         """
-        # WhatsApp specific file patterns
-        whatsapp_patterns = [
-            'WhatsApp Image', 'WhatsApp Video', 'WhatsApp Audio', 'WhatsApp Document',
-            'WA', 'IMG-', 'VID-', 'AUD-', 'DOC-', 'PTT-'
-        ]
-        
         file_lower = filename.lower()
         
-        # Check for WhatsApp patterns
-        is_whatsapp_pattern = any(pattern.lower() in file_lower for pattern in whatsapp_patterns)
-        
-        # Check for valid media extensions
-        valid_extensions = [
-            # Images
-            '.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff', '.heic',
-            # Documents
-            '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt',
-            '.csv', '.rtf', '.odt', '.ods', '.odp', '.pages', '.numbers', '.key',
-            # Audio
-            '.mp3', '.wav', '.ogg', '.m4a', '.aac', '.flac', '.opus', '.amr',
-            # Video
-            '.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp',
-            # Archives
-            '.zip', '.rar', '.7z', '.tar', '.gz', '.bz2',
-        ]
-        
-        is_valid_extension = any(file_lower.endswith(ext) for ext in valid_extensions)
-        
         # Return true if it matches patterns or has valid extension
-        return is_whatsapp_pattern or is_valid_extension
+        return bool(_WHATSAPP_PATTERN_RE.search(file_lower)) or _media_type(file_lower) is not None
     
     def create_file_info(self, file_path: str, phone_number: str, active_chats: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -454,13 +510,12 @@ class FileManager:
         try:
             filename = os.path.basename(file_path)
             
-            # Get file size and creation time
-            file_size = os.path.getsize(file_path)
+            # Get file size and creation time from a single stat
+            file_stat = os.stat(file_path)
+            file_size = file_stat.st_size
             
             # Use creation time or modification time, whichever is more recent
-            file_ctime = os.path.getctime(file_path)
-            file_mtime = os.path.getmtime(file_path)
-            file_time = max(file_ctime, file_mtime)
+            file_time = max(file_stat.st_ctime, file_stat.st_mtime)
             file_date = datetime.fromtimestamp(file_time)
             
             # Try to determine mime type
@@ -525,13 +580,17 @@ class FileManager:
                 file_info = self.create_file_info(file_path, phone_number, {})
                 
                 if file_info:
-                    # Organize file by phone number
-                    organized_path = self.organize_file_by_phone(
-                        file_path, 
-                        file_info["filename"], 
-                        file_info["phone_number"], 
-                        file_info["media_type"]
-                    )
+                    # Organize file by phone number; the file is still processed if that fails
+                    try:
+                        organized_path = self.organize_file_by_phone(
+                            file_path, 
+                            file_info["filename"], 
+                            file_info["phone_number"], 
+                            file_info["media_type"]
+                        )
+                    except OSError as e:
+                        logger.warning(f"Error organizing file {file_path}: {str(e)}")
+                        organized_path = None
                     
                     # Update with organized path
                     file_info["organized_path"] = organized_path
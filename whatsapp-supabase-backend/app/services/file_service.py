@@ -3,12 +3,12 @@ from uuid import UUID
 from app.utils.logger import get_logger
 from app.models.file import File, FileCreate
 from app.services.storage_service import StorageService
-from app.config import settings
-from supabase import create_client, Client
+from supabase import Client
+from app.services.supabase_pool import get_supabase
 from datetime import datetime
 
 logger = get_logger()
-supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
+supabase: Client = get_supabase()
 
 class FileService:
     def __init__(self, user_id: UUID):
@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from uuid import UUID
 
@@ -5,6 +7,9 @@ from app.utils.logger import get_logger
 
 logger = get_logger()
 
+# Files uploaded to storage at the same time; more than a few gives little extra throughput
+UPLOAD_CONCURRENCY = 4
+
 class FileUploadService:
     """Service for uploading WhatsApp files to storage."""
     
@@ -15,6 +20,26 @@ class FileUploadService:
         """
         Upload WhatsApp files to storage.
         
+        Args:
+            user_id: ID of the user who owns the files
+            file_ids: Specific file IDs to upload, or None to upload all unuploaded files for this user
+            
+        Returns:
+            Upload statistics
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.upload_files_async(user_id, file_ids))
+        
+        # Called from inside an event loop (async endpoints), so run the batch on its own loop in a worker thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.upload_files_async(user_id, file_ids)).result()
+    
+    async def upload_files_async(self, user_id: UUID, file_ids: List[str] = None) -> Dict[str, Any]:
+        """
+        Upload WhatsApp files to storage, UPLOAD_CONCURRENCY files at a time.
+        
         Args:
             user_id: ID of the user who owns the files
             file_ids: Specific file IDs to upload, or None to upload all unuploaded files for this user
@@ -33,7 +58,7 @@ class FileUploadService:
                 # Upload all unuploaded files for this user
                 query = query.eq("user_id", str(user_id)).eq("uploaded", False)
             
-            result = query.execute()
+            result = await asyncio.to_thread(query.execute)
             files = result.data if result.data else []
             
             if not files:
@@ -57,66 +82,20 @@ class FileUploadService:
                 "timeouts": 0
             }
             
-            # Process each file
-            for file in files:
-                try:
-                    # Skip already uploaded files
-                    if file.get("uploaded", False):
-                        stats["skipped_duplicates"] += 1
-                        continue
-                    
-                    file_path = file.get("storage_path")
-                    file_id = file.get("id")
-                    
-                    if not file_path:
-                        logger.warning(f"Missing file path for file ID: {file_id}")
-                        stats["errors"] += 1
-                        continue
-                    
-                    # Read file content
-                    try:
-                        with open(file_path, "rb") as f:
-                            file_content = f.read()
-                    except Exception as e:
-                        logger.error(f"Error reading file {file_path}: {str(e)}")
-                        stats["errors"] += 1
-                        continue
-                    
-                    # Generate storage path
-                    filename = file.get("filename", "unknown")
-                    phone_number = file.get("phone_number", "unknown")
-                    media_type = file.get("media_type", "other")
-                    
-                    # Use structured path: user_id/phone_number/media_type/filename
-                    storage_path = f"{user_id}/{phone_number}/{media_type}/{filename}"
-                    
-                    # Upload to storage
-                    try:
-                        result = self.supabase.storage.from_("whatsapp_media").upload(
-                            storage_path, 
-                            file_content,
-                            file_options={"content-type": file.get("mime_type", "application/octet-stream")}
-                        )
-                        
-                        # Get public URL
-                        storage_url = self.supabase.storage.from_("whatsapp_media").get_public_url(storage_path)
-                        
-                        # Update database record
-                        self.supabase.table("files").update({
-                            "uploaded": True,
-                            "storage_url": storage_url,
-                            "storage_path": storage_path
-                        }).eq("id", file_id).execute()
-                        
-                        stats["successful"] += 1
-                        logger.debug(f"Successfully uploaded file: {filename}")
-                    except Exception as e:
-                        logger.error(f"Error uploading file {filename} to storage: {str(e)}")
-                        stats["errors"] += 1
-                        
-                except Exception as e:
-                    logger.error(f"Unexpected error processing file: {str(e)}")
+            # The storage client is synchronous, so each upload runs in a thread and the semaphore bounds them
+            semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+            
+            async def upload(file: Dict[str, Any]) -> str:
+                async with semaphore:
+                    return await asyncio.to_thread(self._upload_file, user_id, file)
+            
+            outcomes = await asyncio.gather(*(upload(file) for file in files), return_exceptions=True)
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    logger.error(f"Unexpected error processing file: {str(outcome)}")
                     stats["errors"] += 1
+                else:
+                    stats[outcome] += 1
             
             return {
                 "status": "success",
@@ -138,6 +117,64 @@ class FileUploadService:
                 "errors": 1
             }
     
+    def _upload_file(self, user_id: UUID, file: Dict[str, Any]) -> str:
+        """
+        Upload a single file and mark it uploaded.
+        
+        Returns:
+            The stats key to count this file under
+        """
+        # Skip already uploaded files
+        if file.get("uploaded", False):
+            return "skipped_duplicates"
+        
+        file_path = file.get("storage_path")
+        file_id = file.get("id")
+        
+        if not file_path:
+            logger.warning(f"Missing file path for file ID: {file_id}")
+            return "errors"
+        
+        # Read file content
+        try:
+            with open(file_path, "rb") as f:
+                file_content = f.read()
+        except Exception as e:
+            logger.error(f"Error reading file {file_path}: {str(e)}")
+            return "errors"
+        
+        # Generate storage path
+        filename = file.get("filename", "unknown")
+        phone_number = file.get("phone_number", "unknown")
+        media_type = file.get("media_type", "other")
+        
+        # Use structured path: user_id/phone_number/media_type/filename
+        storage_path = f"{user_id}/{phone_number}/{media_type}/{filename}"
+        
+        # Upload to storage
+        try:
+            self.supabase.storage.from_("whatsapp_media").upload(
+                storage_path, 
+                file_content,
+                file_options={"content-type": file.get("mime_type", "application/octet-stream")}
+            )
+            
+            # Get public URL
+            storage_url = self.supabase.storage.from_("whatsapp_media").get_public_url(storage_path)
+            
+            # Update database record
+            self.supabase.table("files").update({
+                "uploaded": True,
+                "storage_url": storage_url,
+                "storage_path": storage_path
+            }).eq("id", file_id).execute()
+            
+            logger.debug(f"Successfully uploaded file: {filename}")
+            return "successful"
+        except Exception as e:
+            logger.error(f"Error uploading file {filename} to storage: {str(e)}")
+            return "errors"
+    
     def sync_files_to_storage(self, files: List[Dict[str, Any]], user_id: str) -> Dict[str, int]:
         """
         Sync a list of files to storage.
@@ -84,7 +84,6 @@ class FileUploadService:
                             "storage_url": duplicate.get("storage_url"),
                             "uploaded": True,
                             "upload_error": None,
-                            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ")
                         }).eq("id", file_id).execute()
                         
                         logger.info(f"Using existing storage URL for duplicate file {file_id}")
@@ -128,7 +127,6 @@ class FileUploadService:
                         "storage_path": destination_path,
                         "uploaded": True,
                         "upload_error": None,
-                        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ")
                     }).eq("id", file_id).execute()
                     
                     logger.info(f"Successfully uploaded file {file_id} to {destination_path}")
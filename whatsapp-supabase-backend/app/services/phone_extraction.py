@@ -1,14 +1,41 @@
 import re
+from bisect import bisect_left
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from app.utils.logger import get_logger
 
 logger = get_logger()
 
+_NON_DIGIT_RE = re.compile(r'\D')
+
+# WhatsApp folder patterns, compiled once; tried in order before the filename patterns
+_FOLDER_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'(\d+)@s\.whatsapp\.net',  # Regular contacts
+    r'(\d+)@status',            # Status updates
+))
+
+# Common filename patterns in priority order; kept separate rather than joined into one
+# alternation, which would return the leftmost match instead of the highest-priority one
+_FILENAME_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'from \+(\d+)',
+    r'from \((\d+)\)',
+    r'from (\d{10,})',
+    r'(\d{10,})\.',
+    r'WhatsApp.*?(\d{10,})',
+))
+
+def normalize_phone(phone: str) -> str:
+    """Reduce a displayed phone number such as "+91 98765-43210" to its digits."""
+    return _NON_DIGIT_RE.sub('', phone)
+
 class PhoneExtractor:
     """Handles extracting phone numbers from WhatsApp filenames and matching with active chats."""
     
+    def __init__(self):
+        # (active_chats, sorted timestamps, phones in the same order) for the chats last matched against
+        self._chat_index = None
+    
     def extract_phone_number(self, filename_or_path: str, file_date: datetime, active_chats: Dict[str, Any]) -> str:
         """
         Try to extract phone number from filename, path, or match with active chats.
@@ -16,44 +43,30 @@ class PhoneExtractor:
         Args:
             filename_or_path: The WhatsApp filename or full path to analyze
             file_date: Timestamp of the file
-            active_chats: Dictionary of active chats with timestamps
+            active_chats: Active chats keyed by normalized phone number (or title), with timestamps
             
         Returns:
             Extracted phone number or "unknown"
         """
         logger.debug(f"Attempting to extract phone number from: {filename_or_path}")
         
-        # Define all WhatsApp folder patterns
-        whatsapp_folder_patterns = [
-            r'(\d+)@s\.whatsapp\.net',  # Regular contacts
-            r'(\d+)@status'             # Status updates
-        ]
-        
         # Try each folder pattern
-        for pattern in whatsapp_folder_patterns:
-            folder_match = re.search(pattern, filename_or_path)
+        for pattern in _FOLDER_PATTERNS:
+            folder_match = pattern.search(filename_or_path)
             if folder_match:
                 phone_number = folder_match.group(1)
-                logger.info(f"Extracted phone number {phone_number} from pattern {pattern} in path: {filename_or_path}")
+                logger.info(f"Extracted phone number {phone_number} from pattern {pattern.pattern} in path: {filename_or_path}")
                 return phone_number
                 
         # Log that we couldn't find a match in folder pattern
         logger.debug(f"No WhatsApp folder pattern match for: {filename_or_path}")
         
         # Next try common filename patterns
-        phone_patterns = [
-            r'from \+(\d+)',
-            r'from \((\d+)\)',
-            r'from (\d{10,})',
-            r'(\d{10,})\.', 
-            r'WhatsApp.*?(\d{10,})',
-        ]
-        
-        for pattern in phone_patterns:
-            matches = re.search(pattern, filename_or_path)
+        for pattern in _FILENAME_PATTERNS:
+            matches = pattern.search(filename_or_path)
             if matches:
                 phone_number = matches.group(1)
-                logger.info(f"Extracted phone number {phone_number} from filename pattern {pattern} in: {filename_or_path}")
+                logger.info(f"Extracted phone number {phone_number} from filename pattern {pattern.pattern} in: {filename_or_path}")
                 return phone_number
                 
         # Log that we couldn't find a match in filename pattern
@@ -66,7 +79,7 @@ class PhoneExtractor:
         
         # Log all possible patterns we tried
         logger.warning(f"Failed to extract phone number from path: {filename_or_path}")
-        logger.warning(f"Tried patterns: {whatsapp_folder_patterns + phone_patterns}")
+        logger.warning(f"Tried patterns: {[pattern.pattern for pattern in _FOLDER_PATTERNS + _FILENAME_PATTERNS]}")
         logger.warning(f"Also tried matching with {len(active_chats) if active_chats else 0} active chats")
         
         # Default fallback
@@ -78,22 +91,20 @@ class PhoneExtractor:
             logger.debug(f"No active chats available for matching with: {filename}")
             return None
             
-        # Try to extract date from filename
-        date_match = re.search(r'(\d{8})|\d{6}|\d{4}-\d{2}-\d{2}', filename)
-        
-        # Find the closest chat by timestamp
+        # Find the closest chat by timestamp: binary search the sorted chat times, then
+        # compare the neighbours on either side of the file's time
+        chat_times, chat_phones = self._sorted_chat_times(active_chats)
+        file_time = file_date.timestamp()
         closest_chat = None
         closest_diff = float('inf')
         
-        for phone, chat_info in active_chats.items():
-            if 'last_activity' in chat_info:
-                chat_time = chat_info['last_activity']
-                time_diff = abs((chat_time - file_date).total_seconds())
-                logger.debug(f"Time diff for {filename} with {phone}: {time_diff}s")
-                
+        index = bisect_left(chat_times, file_time)
+        for neighbour in (index - 1, index):
+            if 0 <= neighbour < len(chat_times):
+                time_diff = abs(chat_times[neighbour] - file_time)
                 if time_diff < closest_diff:
                     closest_diff = time_diff
-                    closest_chat = phone
+                    closest_chat = chat_phones[neighbour]
         
         # Use a wider time window (12 hours instead of 1 hour)
         if closest_chat and closest_diff < 43200:  # 12 hours
@@ -104,4 +115,28 @@ class PhoneExtractor:
             if closest_chat:
                 logger.debug(f"Closest chat was {closest_chat} with time diff: {closest_diff}s")
             
-        return None
\ No newline at end of file
+        return None
+    
+    def _sorted_chat_times(self, active_chats: Dict[str, Any]) -> Tuple[List[float], List[str]]:
+        """
+        Return chat activity timestamps in ascending order with their phones.
+        
+        A scan matches every file against the same active_chats dict, so the sorted index is
+        built once and reused until a different dict is passed in or the dict changes size.
+        """
+        cached = self._chat_index
+        # Chats without a last_activity are left out of the index, so compare the dict's own size
+        if cached is not None and cached[0] is active_chats and cached[1] == len(active_chats):
+            return cached[2], cached[3]
+        
+        chats = sorted(
+            (chat_info['last_activity'].timestamp(), phone)
+            for phone, chat_info in active_chats.items()
+            if 'last_activity' in chat_info
+        )
+        chat_times = [chat_time for chat_time, _ in chats]
+        chat_phones = [phone for _, phone in chats]
+        
+        # Assigned as one tuple so concurrent scan threads never see a half-built index
+        self._chat_index = (active_chats, len(active_chats), chat_times, chat_phones)
+        return chat_times, chat_phones
@@ -0,0 +1,166 @@
+import os
+import shutil
+import threading
+from typing import Dict, Optional
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+# Free space left in the RAM filesystem beyond twice the profile size before a copy is attempted
+_SHM_HEADROOM = 64 * 1024 * 1024
+
+# Scratch directories persist_profile keeps inside the data dir while swapping a snapshot in
+_STAGING_DIR = ".profile-staging"
+_TRASH_DIR = ".profile-trash"
+
+# The data dir doubles as the Chrome profile; these entries are our media and scratch space,
+# not Chrome state
+_NON_PROFILE_ENTRIES = {"downloads", "organized_by_phone", "organized", _STAGING_DIR, _TRASH_DIR}
+
+# Chrome's single-instance markers; a copied one would make the other copy look in use
+_LOCK_FILES = {"SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile"}
+
+# Serializes copies in either direction per profile, so Chrome never starts on a RAM profile
+# that is still being written back to disk
+_profile_locks: Dict[str, threading.Lock] = {}
+_profile_locks_guard = threading.Lock()
+
+def _profile_lock(data_dir: str) -> threading.Lock:
+    """Return the lock guarding copies of a profile directory."""
+    with _profile_locks_guard:
+        return _profile_locks.setdefault(data_dir, threading.Lock())
+
+def _ram_dir(data_dir: str) -> Optional[str]:
+    """Return the RAM-backed copy location for a profile, or None if the cache is disabled."""
+    cache_root = settings.chrome_profile_cache_dir
+    if not cache_root or not os.path.isdir(os.path.dirname(os.path.normpath(cache_root))):
+        return None
+    return os.path.join(cache_root, os.path.basename(os.path.normpath(data_dir)))
+
+def _profile_ignore(data_dir: str):
+    """Build a copytree ignore callback skipping lock files and, at the top level, our media."""
+    top = os.path.normpath(data_dir)
+
+    def ignore(directory, names):
+        skipped = {name for name in names if name in _LOCK_FILES}
+        if os.path.normpath(directory) == top:
+            skipped.update(name for name in names if name in _NON_PROFILE_ENTRIES)
+        return skipped
+
+    return ignore
+
+def _profile_size(data_dir: str) -> int:
+    """Total size in bytes of the Chrome state in a profile directory."""
+    total = 0
+    for root, dirs, files in os.walk(data_dir):
+        if os.path.normpath(root) == os.path.normpath(data_dir):
+            dirs[:] = [name for name in dirs if name not in _NON_PROFILE_ENTRIES]
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def ram_profile_dir(data_dir: str) -> str:
+    """
+    Return the directory Chrome should use as this profile's user-data-dir.
+
+    With a RAM-backed cache configured (/dev/shm by default), the on-disk profile is copied
+    there on first use so WhatsApp's IndexedDB is read from memory. Profiles over the size cap,
+    or that would not fit, keep running from disk.
+
+    Args:
+        data_dir: The user's on-disk data directory
+
+    Returns:
+        The RAM copy of the profile, or data_dir itself
+    """
+    ram_dir = _ram_dir(data_dir)
+    if ram_dir is None:
+        return data_dir
+
+    with _profile_lock(data_dir):
+        return _copy_to_ram(data_dir, ram_dir)
+
+def _copy_to_ram(data_dir: str, ram_dir: str) -> str:
+    """Copy a profile into its RAM location unless it is already there; see ram_profile_dir."""
+    # Left by an earlier driver in this container, so at least as fresh as the disk copy
+    if os.path.isdir(ram_dir):
+        return ram_dir
+
+    size = _profile_size(data_dir)
+    if size > settings.chrome_profile_cache_max_mb * 1024 * 1024:
+        logger.info(f"Profile {data_dir} is {size // (1024 * 1024)}MB, running it from disk")
+        return data_dir
+
+    cache_root = settings.chrome_profile_cache_dir
+    try:
+        free = shutil.disk_usage(os.path.dirname(os.path.normpath(cache_root))).free
+        if free < 2 * size + _SHM_HEADROOM:
+            logger.info(f"Not enough RAM disk space for profile {data_dir}, running it from disk")
+            return data_dir
+
+        # Copy under a temporary name so an interrupted copy is never mistaken for a profile
+        staging_dir = f"{ram_dir}.tmp"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        if os.path.isdir(data_dir):
+            shutil.copytree(data_dir, staging_dir, ignore=_profile_ignore(data_dir))
+        else:
+            os.makedirs(staging_dir)
+        os.rename(staging_dir, ram_dir)
+        logger.info(f"Copied profile {data_dir} ({size // 1024}KB) to {ram_dir}")
+        return ram_dir
+    except OSError as e:
+        logger.warning(f"Could not copy profile {data_dir} to RAM, running it from disk: {e}")
+        return data_dir
+
+def persist_profile(data_dir: str):
+    """
+    Copy a RAM profile back to disk so the WhatsApp login survives a restart.
+
+    Call only once the profile's Chrome has quit. The snapshot is staged inside data_dir and
+    each top-level entry is then swapped in whole, so files Chrome deleted in RAM do not
+    linger on disk and a failed copy leaves the previous profile untouched.
+
+    Args:
+        data_dir: The user's on-disk data directory
+    """
+    ram_dir = _ram_dir(data_dir)
+    if ram_dir is None or not os.path.isdir(ram_dir):
+        return
+
+    staging_dir = os.path.join(data_dir, _STAGING_DIR)
+    trash_dir = os.path.join(data_dir, _TRASH_DIR)
+    with _profile_lock(data_dir):
+        try:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            shutil.copytree(ram_dir, staging_dir, ignore=_profile_ignore(ram_dir))
+        except OSError as e:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            logger.warning(f"Could not snapshot profile {ram_dir}: {e}")
+            return
+
+        replaced = []
+        try:
+            shutil.rmtree(trash_dir, ignore_errors=True)
+            os.makedirs(trash_dir)
+            for name in os.listdir(staging_dir):
+                target = os.path.join(data_dir, name)
+                if os.path.lexists(target):
+                    os.rename(target, os.path.join(trash_dir, name))
+                    replaced.append(name)
+                os.rename(os.path.join(staging_dir, name), target)
+            logger.info(f"Persisted profile {ram_dir} to {data_dir}")
+        except OSError as e:
+            # Put back whatever was moved aside but not yet replaced
+            for name in replaced:
+                target = os.path.join(data_dir, name)
+                if not os.path.lexists(target):
+                    os.rename(os.path.join(trash_dir, name), target)
+            logger.warning(f"Could not persist profile {data_dir}: {e}")
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            shutil.rmtree(trash_dir, ignore_errors=True)
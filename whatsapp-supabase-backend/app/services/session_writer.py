@@ -0,0 +1,156 @@
+import json
+import time
+import atexit
+import threading
+from typing import Dict, Any, List
+
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+# Seconds between background flushes of queued session updates
+SESSION_FLUSH_INTERVAL = 0.25
+
+# Pending sessions that trigger an early flush
+SESSION_FLUSH_MAX_PENDING = 50
+
+# Times a failed session update is retried before it is dropped
+SESSION_WRITE_RETRIES = 6
+
+# Seconds before the first retry of a failed update; each later retry waits twice as long, so
+# the retries span about a minute of database or network outage
+SESSION_RETRY_DELAY = 1.0
+
+class SessionWriteBatcher:
+    """
+    Coalesces updates to the sessions table and writes them from a background thread.
+
+    Patches for the same session are merged, newest value winning, so a burst of status
+    polls costs one UPDATE. Sessions sharing an identical patch are written together with
+    a single UPDATE ... WHERE id IN (...).
+    """
+
+    def __init__(self, supabase_client, interval: float = SESSION_FLUSH_INTERVAL,
+                 max_pending: int = SESSION_FLUSH_MAX_PENDING):
+        """
+        Args:
+            supabase_client: Client used for the UPDATE requests
+            interval: Seconds between flushes
+            max_pending: Number of pending sessions that triggers an immediate flush
+        """
+        self.supabase = supabase_client
+        self._interval = interval
+        self._max_pending = max_pending
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._failures: Dict[str, int] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def update(self, session_id: str, patch: Dict[str, Any]):
+        """
+        Queue a patch for a session row.
+
+        Args:
+            session_id: ID of the session to update
+            patch: Columns to set
+        """
+        with self._lock:
+            self._pending.setdefault(session_id, {}).update(patch)
+            pending = len(self._pending)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+                self._thread.start()
+
+        if pending >= self._max_pending:
+            self._wake.set()
+
+    def flush(self, force: bool = False):
+        """
+        Write every queued patch that is not waiting out a retry backoff.
+
+        Args:
+            force: Also write patches whose retry is not due yet, as on process exit
+        """
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._lock:
+                if force or not self._retry_at:
+                    pending, self._pending = self._pending, {}
+                else:
+                    pending = {
+                        session_id: patch for session_id, patch in self._pending.items()
+                        if self._retry_at.get(session_id, 0) <= now
+                    }
+                    for session_id in pending:
+                        del self._pending[session_id]
+            if not pending:
+                return
+
+            # Group sessions by identical patch so each distinct patch is one request
+            groups: Dict[str, List[str]] = {}
+            patches: Dict[str, Dict[str, Any]] = {}
+            for session_id, patch in pending.items():
+                key = json.dumps(patch, sort_keys=True, default=str)
+                groups.setdefault(key, []).append(session_id)
+                patches[key] = patch
+
+            for key, session_ids in groups.items():
+                try:
+                    self.supabase.table("sessions").update(patches[key]).in_("id", session_ids).execute()
+                    logger.debug(f"Flushed session update {key} for {len(session_ids)} session(s)")
+                except Exception as e:
+                    logger.error(f"Error updating sessions {session_ids}: {e}")
+                    self._requeue(session_ids, patches[key])
+                    continue
+
+                if self._failures:
+                    with self._lock:
+                        for session_id in session_ids:
+                            self._failures.pop(session_id, None)
+                            self._retry_at.pop(session_id, None)
+
+    def _requeue(self, session_ids: List[str], patch: Dict[str, Any]):
+        """Put a failed patch back with exponential backoff, up to SESSION_WRITE_RETRIES times."""
+        now = time.monotonic()
+        with self._lock:
+            for session_id in session_ids:
+                failures = self._failures.get(session_id, 0) + 1
+                if failures > SESSION_WRITE_RETRIES:
+                    self._failures.pop(session_id, None)
+                    self._retry_at.pop(session_id, None)
+                    logger.error(f"Dropping update {patch} for session {session_id} after {SESSION_WRITE_RETRIES} retries")
+                    continue
+                self._failures[session_id] = failures
+                self._retry_at[session_id] = now + SESSION_RETRY_DELAY * 2 ** (failures - 1)
+
+                # Anything queued since this flush started is newer and wins
+                self._pending[session_id] = {**patch, **self._pending.get(session_id, {})}
+
+    def _run(self):
+        """Background loop flushing queued patches every interval."""
+        while True:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            self.flush()
+
+_batchers: Dict[int, SessionWriteBatcher] = {}
+_batchers_lock = threading.Lock()
+
+def get_session_writer(supabase_client) -> SessionWriteBatcher:
+    """Return the session write batcher for a Supabase client, creating it on first use."""
+    with _batchers_lock:
+        batcher = _batchers.get(id(supabase_client))
+        if batcher is None:
+            batcher = _batchers[id(supabase_client)] = SessionWriteBatcher(supabase_client)
+        return batcher
+
+@atexit.register
+def _flush_all():
+    """Write whatever is still queued when the process exits."""
+    with _batchers_lock:
+        batchers = list(_batchers.values())
+    for batcher in batchers:
+        batcher.flush(force=True)
@@ -1,9 +1,9 @@
 import os
+import hashlib
 from typing import Dict, List, Any, Optional
 from uuid import UUID
 from app.utils.logger import get_logger
-from app.config import settings
-from supabase import create_client, Client
+from app.services.supabase_pool import get_supabase, get_service_supabase
 from datetime import datetime
 
 logger = get_logger()
@@ -11,10 +11,10 @@ logger = get_logger()
 class StorageService:
     def __init__(self, user_id: UUID):
         self.user_id = user_id
-        # Create regular client for user-based operations
-        self.client = create_client(settings.supabase_url, settings.supabase_key)
-        # Create service role client for storage operations
-        self.service_client = create_client(settings.supabase_url, settings.supabase_service_key)
+        # Shared regular client for user-based operations
+        self.client = get_supabase()
+        # Shared service role client for storage operations
+        self.service_client = get_service_supabase()
         
         logger.debug(f"Initialized StorageService for user {user_id}")
 
@@ -70,7 +70,6 @@ class StorageService:
                 self.service_client.table("files").update({
                     "uploaded": True,
                     "storage_path": storage_path,
-                    "updated_at": datetime.utcnow().isoformat()
                 }).eq("id", str(file_id)).execute()
                 
                 return {"success": True, "storage_path": storage_path, "status": "already_exists"}
@@ -118,7 +117,6 @@ class StorageService:
                         "uploaded": True,
                         "storage_path": storage_path,
                         "storage_url": url,
-                        "updated_at": datetime.utcnow().isoformat()
                     }).eq("id", str(file_id)).execute()
                     
                     return {"success": True, "storage_path": storage_path, "url": url}
@@ -156,7 +154,6 @@ class StorageService:
                                 "uploaded": True,
                                 "storage_path": new_path,
                                 "storage_url": url,
-                                "updated_at": datetime.utcnow().isoformat()
                             }).eq("id", str(file_id)).execute()
                             
                             return {"success": True, "storage_path": new_path, "url": url}
@@ -169,7 +166,6 @@ class StorageService:
                 # Update upload attempts
                 self.service_client.table("files").update({
                     "upload_attempts": file_data.get("upload_attempts", 0) + 1,
-                    "updated_at": datetime.utcnow().isoformat()
                 }).eq("id", str(file_id)).execute()
                 
                 return {"success": False, "error": str(e)}
@@ -200,6 +196,25 @@ class StorageService:
             .execute()
         
         return result.data if result.data else []
+    
+    def get_missing_files_version(self) -> str:
+        """
+        Fingerprint the user's missing files without fetching them.
+        
+        Any insert, delete or update of a not-yet-uploaded row changes its id set or an
+        updated_at (kept by a trigger), so equal fingerprints mean an unchanged list.
+        """
+        result = self.service_client.table("files") \
+            .select("id,updated_at") \
+            .eq("user_id", str(self.user_id)) \
+            .eq("uploaded", False) \
+            .order("id") \
+            .execute()
+        
+        digest = hashlib.sha1()
+        for row in result.data or []:
+            digest.update(f"{row['id']}:{row.get('updated_at')};".encode())
+        return digest.hexdigest()
         
     def get_file_url(self, file_id: UUID) -> Optional[str]:
         """Get the public URL for a file."""
@@ -224,7 +239,6 @@ class StorageService:
                     # Update the record with the URL
                     self.service_client.table("files").update({
                         "storage_url": url,
-                        "updated_at": datetime.utcnow().isoformat()
                     }).eq("id", str(file_id)).execute()
                     
                     return url
@@ -2,7 +2,7 @@ import os
 import hashlib
 import traceback
 from typing import Dict, Any, List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 import mimetypes
 from app.utils.logger import get_logger
 
@@ -189,14 +189,15 @@ class StorageServiceHelper:
         
         # Try creating an "upload failed" record for monitoring
         try:
+            now = datetime.now(timezone.utc).isoformat()
             failed_record = {
                 "file_hash": file_hash,
                 "local_path": file_path,
                 "attempted_path": destination_path,
                 "last_error": last_error,
                 "upload_attempts": attempt,
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
+                "created_at": now,
+                "updated_at": now,
                 "status": "failed"
             }
             
@@ -324,7 +325,6 @@ class StorageServiceHelper:
                 "uploaded": True,
                 "storage_path": storage_path,
                 "storage_url": storage_url,
-                "updated_at": datetime.utcnow().isoformat()
             }
             
             # Add phone number if available
@@ -352,8 +352,6 @@ class StorageServiceHelper:
                     "storage_path": storage_path,
                     "storage_url": storage_url,
                     "mime_type": metadata.get("mime_type", "application/octet-stream"),
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat(),
                     "upload_attempts": 1
                 }
                 
@@ -396,7 +394,6 @@ class StorageServiceHelper:
                 # Update counter
                 client.table("files").update({
                     "upload_attempts": current_attempts + 1,
-                    "updated_at": datetime.utcnow().isoformat()
                 }).eq("file_hash", file_hash).execute()
             else:
                 logger.warning(f"No record found for file hash {file_hash} when incrementing upload attempts")
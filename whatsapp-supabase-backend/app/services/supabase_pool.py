@@ -0,0 +1,46 @@
+import threading
+from typing import Optional
+from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+# One client per key for the whole process; each client keeps its own HTTP connection pool
+_client: Optional[Client] = None
+_service_client: Optional[Client] = None
+_client_lock = threading.Lock()
+
+def _client_options() -> ClientOptions:
+    """Options shared by both clients; bounds how long a stuck request can hold a worker thread."""
+    return ClientOptions(
+        postgrest_client_timeout=settings.supabase_timeout,
+        storage_client_timeout=settings.supabase_storage_timeout
+    )
+
+def get_supabase() -> Client:
+    """Return the shared Supabase client using the anon key."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_client(settings.supabase_url, settings.supabase_key, options=_client_options())
+                logger.info("Created shared Supabase client")
+    return _client
+
+def get_service_supabase() -> Client:
+    """Return the shared Supabase client using the service role key."""
+    global _service_client
+    if _service_client is None:
+        with _client_lock:
+            if _service_client is None:
+                if not settings.supabase_url or not settings.supabase_service_key:
+                    logger.error("Missing Supabase configuration in settings")
+                    raise ValueError("Missing Supabase settings. Check supabase_url and supabase_service_key in settings.")
+                _service_client = create_client(
+                    settings.supabase_url, settings.supabase_service_key, options=_client_options()
+                )
+                logger.info("Created shared Supabase service role client")
+    return _service_client
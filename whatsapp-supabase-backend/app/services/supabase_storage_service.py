@@ -6,8 +6,7 @@ from datetime import datetime
 import hashlib
 import mimetypes
 from app.utils.logger import get_logger
-from app.config import settings
-from supabase import create_client
+from app.services.supabase_pool import get_service_supabase
 
 logger = get_logger()
 
@@ -20,20 +19,15 @@ class SupabaseStorageService:
         
         Args:
             supabase_client: The Supabase client instance (optional)
-                             If not provided, a service role client will be created
+                             If not provided, the shared service role client is used
         """
         if supabase_client:
             logger.info("Using provided Supabase client")
             self.supabase = supabase_client
         else:
-            # Create a new client with service role key
-            logger.info("Creating new Supabase client with service role key")
-            
-            if not settings.supabase_url or not settings.supabase_service_key:
-                logger.error("Missing Supabase configuration in settings")
-                raise ValueError("Missing Supabase settings. Check supabase_url and supabase_service_key in settings.")
-                
-            self.supabase = create_client(settings.supabase_url, settings.supabase_service_key)
+            # Fall back to the shared service role client
+            logger.info("Using shared Supabase client with service role key")
+            self.supabase = get_service_supabase()
     
     def upload(self, 
               bucket: str, 
@@ -1,58 +1,313 @@
 import os
 import time
-from datetime import datetime
-from typing import Dict, Any
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Set, Tuple
 from uuid import UUID
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import SessionNotCreatedException, WebDriverException
+from app.config import settings
 from app.models.session import SessionStatus
+from app.services.driver_pool import DriverPool
+from app.services.profile_cache import ram_profile_dir, persist_profile
+from app.services.session_writer import get_session_writer
 from app.utils.logger import get_logger
+from app.utils.driver_cache import get_driver_path, invalidate_driver_path
 
 logger = get_logger()
 
+WHATSAPP_WEB_URL = "https://web.whatsapp.com/"
+
+# Storage bucket for QR code images and how long their signed URLs stay valid
+QR_BUCKET = "qr"
+QR_URL_EXPIRES_IN = 300
+
+# (png_digest, qr_reference, published_at) of the last QR uploaded per session, oldest first.
+# WhatsApp only rotates its QR code every ~20s while polls come every few seconds, so a repeat
+# capture reuses the stored image and signed URL until half its lifetime has passed.
+_published_qr: "OrderedDict[str, Tuple[str, Dict[str, Any], float]]" = OrderedDict()
+_published_qr_lock = threading.Lock()
+
+# Sessions whose last QR upload is remembered; abandoned logins beyond this are dropped oldest first
+PUBLISHED_QR_MAX = 256
+
+# Seconds an "active" write is trusted before a poll re-asserts it, in case another worker
+# process changed the row; within the window only status transitions are written
+STATUS_WRITE_INTERVAL = 60
+
+# (status, written_at) last queued per session, oldest first. Services are built per request, so
+# this lives at module level for repeat polls of one session to see each other's writes. Entries
+# older than STATUS_WRITE_INTERVAL suppress nothing and are evicted on the next write.
+_status_writes: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+_status_writes_lock = threading.Lock()
+
+# Chrome flags shared by every WhatsApp Web driver
+_CHROME_ARGUMENTS = (
+    "--headless",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    # Skip images, notifications and background services a headless session never uses
+    "--blink-settings=imagesEnabled=false",
+    "--disable-extensions",
+    "--disable-gpu",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-client-side-phishing-detection",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-features=TranslateUI",
+    "--metrics-recording-only",
+    "--no-first-run",
+    "--mute-audio",
+)
+_CHROME_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+
+# Subresources WhatsApp Web never needs for the QR code or login detection; blocked over CDP.
+# Stylesheets stay allowed because the QR canvas is clipped by its laid-out position.
+_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf",
+    "*/mms/*",
+]
+
+# Cleared once the database turns out to have no merge_session_data function, so later
+# merges go straight to the client-side path instead of paying for a failing RPC first
+_merge_rpc_available = True
+
+# PostgREST and Postgres error codes for a function that does not exist
+_MISSING_FUNCTION_CODES = {"PGRST202", "42883"}
+
+# QR uploads that the caller does not wait for (the response already carries the image)
+_QR_UPLOADER = ThreadPoolExecutor(max_workers=2, thread_name_prefix="wa-qr-upload")
+
+_driver_path: Optional[str] = None
+_driver_path_lock = threading.Lock()
+
+def _get_driver_path() -> str:
+    """Resolve the ChromeDriver binary once per process."""
+    global _driver_path
+    if _driver_path is None:
+        with _driver_path_lock:
+            if _driver_path is None:
+                if settings.chromedriver_path:
+                    _driver_path = settings.chromedriver_path
+                else:
+                    _driver_path = _resolve_driver_path()
+                logger.info(f"Using ChromeDriver at path: {_driver_path}")
+    return _driver_path
+
+def _forget_driver_path():
+    """Drop the resolved ChromeDriver path so the next driver start resolves it again."""
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path and _driver_path != settings.chromedriver_path:
+            logger.warning(f"Forgetting ChromeDriver at {_driver_path} after Chrome refused to start a session")
+            _driver_path = None
+            invalidate_driver_path()
+
+def prefetch_driver_path():
+    """Resolve ChromeDriver on a background thread so the first session does not wait for it."""
+    def resolve():
+        try:
+            _get_driver_path()
+        except Exception as e:
+            # The first driver start resolves it again and reports the error to its caller
+            logger.warning(f"Could not resolve ChromeDriver at startup: {e}")
+    
+    threading.Thread(target=resolve, name="chromedriver-prefetch", daemon=True).start()
+
+def _resolve_driver_path() -> str:
+    """Find ChromeDriver on PATH or via Selenium Manager, with webdriver-manager as a last resort."""
+    try:
+        # Selenium Manager ships with selenium and caches drivers under ~/.cache/selenium
+        from selenium.webdriver.common.driver_finder import DriverFinder
+        return DriverFinder.get_path(Service(), Options())
+    except Exception as e:
+        logger.warning(f"Selenium Manager could not resolve ChromeDriver, falling back to webdriver-manager: {e}")
+        # The on-disk cache skips webdriver-manager's version lookup on restarts within a day
+        return get_driver_path()
+
+def _new_service() -> Service:
+    """Build a chromedriver Service from the cached driver path."""
+    # A Service owns its chromedriver process, so only the resolved path is shared
+    return Service(executable_path=_get_driver_path())
+
+# Number of attempts made to start Chrome before giving up
+DRIVER_START_ATTEMPTS = 3
+
+_driver_locks: Dict[str, threading.Lock] = {}
+_driver_locks_guard = threading.Lock()
+
+def _get_driver_lock(data_dir: str) -> threading.Lock:
+    """Return the lock serializing Chrome startup for a profile directory."""
+    with _driver_locks_guard:
+        lock = _driver_locks.get(data_dir)
+        if lock is None:
+            lock = _driver_locks[data_dir] = threading.Lock()
+        return lock
+
+def _build_options(data_dir: str) -> Options:
+    """Build Chrome options for a driver using the given profile directory."""
+    chrome_options = Options()
+    for argument in _CHROME_ARGUMENTS:
+        chrome_options.add_argument(argument)
+    chrome_options.add_argument(f"--user-data-dir={data_dir}")
+    chrome_options.add_experimental_option("prefs", dict(_CHROME_PREFS))
+    return chrome_options
+
+def _start_driver(data_dir: str) -> webdriver.Chrome:
+    """Start Chrome on a profile directory, retrying transient startup failures."""
+    # Chrome reads the RAM copy of the profile when one fits; the pool writes it back once the driver quits
+    profile_dir = ram_profile_dir(data_dir)
+    for attempt in range(1, DRIVER_START_ATTEMPTS + 1):
+        try:
+            driver = webdriver.Chrome(service=_new_service(), options=_build_options(profile_dir))
+            break
+        except WebDriverException as e:
+            if attempt == DRIVER_START_ATTEMPTS:
+                if isinstance(e, SessionNotCreatedException):
+                    # Usually a driver built for an older Chrome; resolve a new one next time
+                    _forget_driver_path()
+                raise
+            delay = 0.5 * 2 ** (attempt - 1)
+            logger.warning(f"Chrome start attempt {attempt} failed, retrying in {delay}s: {e}")
+            time.sleep(delay)
+    
+    driver.set_script_timeout(SCRIPT_TIMEOUT)
+    # Pin implicit waits off: every wait here is an explicit in-page deadline, and a lookup
+    # that misses must fail at once rather than stall a status poll
+    driver.implicitly_wait(0)
+    
+    # Skip images, fonts and media before the first navigation; the block list lives as long as the tab
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": _BLOCKED_URLS})
+    except WebDriverException as e:
+        logger.warning(f"Could not block subresources for {data_dir}: {e}")
+    return driver
+
+# Warm drivers shared by every request for the same profile. A RAM profile is written back to
+# disk only once its Chrome has quit, so the snapshot never races the browser's own writes.
+_DRIVER_POOL = DriverPool(_start_driver, on_quit=persist_profile)
+
+def shutdown_drivers():
+    """Quit every pooled Chrome and write RAM profiles back to disk; run on app shutdown."""
+    # Let queued QR uploads finish so none races the quits below
+    _QR_UPLOADER.shutdown(wait=True)
+    
+    # Each quit persists its profile through the pool's on_quit hook
+    _DRIVER_POOL.close_all()
+
+# Elements that only exist after login (side panel, chat icon, menu icon), joined into one
+# selector list so the browser matches them all in a single query
+_AUTH_SELECTOR = ", ".join((
+    "#pane-side",
+    "[data-icon='chat']",
+    "[data-icon='menu']",
+))
+
+# Seconds check_session_status waits for either the chat list or the QR code
+STATUS_QR_TIMEOUT = 5.0
+
+# Snapshot of every _is_authenticated indicator in one round-trip. The page-content check
+# serializes the DOM like page_source did, so it only runs when the title check needs it.
+_AUTH_PROBE_SCRIPT = """
+const title = document.title;
+const titleOk = title.includes("WhatsApp") && !title.includes("Login");
+return {
+    loggedIn: !!document.querySelector(arguments[0]),
+    qr: !!document.querySelector("canvas"),
+    title: title,
+    url: location.href,
+    ready: titleOk && document.documentElement.outerHTML.includes("WhatsApp is ready")
+};
+"""
+
+# Consecutive status polls that find neither a login nor a QR code before WhatsApp Web is
+# reloaded; below this the page is assumed to still be loading or syncing on its own
+STUCK_POLL_LIMIT = 3
+
+# Profiles that showed a QR code since their driver started. Their first login lives only in
+# the RAM profile, so Chrome is quit as soon as the login is seen and the pool's on_quit hook
+# writes the profile to disk; copying it while Chrome still runs would catch half-written files.
+_qr_shown: Set[str] = set()
+
+# Stuck-poll count per profile directory (polls build a new service each time)
+_stuck_polls: Dict[str, int] = {}
+
+# Page replacements tolerated during one login/QR wait; a dead driver fails every attempt
+WAIT_INTERRUPT_LIMIT = 5
+
+# Resolves as soon as a login marker (first) or, unless withQr is false, the QR canvas appears,
+# or with null at the deadline. Driven by DOM mutations rather than a poll interval, so there is no poll latency. The QR comes back as its rect in page coordinates, what Page.captureScreenshot clips by.
+_WAIT_FOR_LOGIN_OR_QR_SCRIPT = """
+const [authSelector, timeoutMs, withQr, done] = arguments;
+const probe = () => {
+    if (document.querySelector(authSelector)) return ["authenticated", null];
+    const qr = withQr && document.querySelector("canvas");
+    if (!qr) return null;
+    const box = qr.getBoundingClientRect();
+    return ["qr", {x: box.left + window.scrollX, y: box.top + window.scrollY, width: box.width, height: box.height}];
+};
+const found = probe();
+if (found) return done(found);
+const observer = new MutationObserver((records) => {
+    // Both markers arrive as inserted nodes, so batches that only remove nodes skip the queries
+    if (!records.some((record) => record.addedNodes.length)) return;
+    const hit = probe();
+    if (hit) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(hit);
+    }
+});
+const timer = setTimeout(() => {
+    observer.disconnect();
+    done(null);
+}, timeoutMs);
+observer.observe(document.documentElement, {childList: true, subtree: true});
+"""
+
+# Upper bound for in-page waits; every wait passes its own shorter deadline to the script
+SCRIPT_TIMEOUT = 30
+
 class WhatsAppAuthentication:
     """Handles WhatsApp web authentication and session management."""
     
-    def __init__(self, user_id: UUID, data_dir: str, supabase_client):
+    def __init__(self, user_id: UUID, data_dir: str, supabase_client, qr_timeout: float = 7.0):
         self.user_id = user_id
         self.data_dir = data_dir
         self.supabase = supabase_client
+        self.qr_timeout = qr_timeout
         self.driver = None
         self.session_id = None
+        self._qr_screenshot_saved = False
+        self._debug_screenshot_saved = False
+    
+    def _ensure_driver(self):
+        """Take this profile's driver from the pool if this session does not have one yet."""
+        if self.driver:
+            return
+        
+        # Chrome cannot open one profile directory twice, so acquires are serialized per data_dir
+        with _get_driver_lock(self.data_dir):
+            self.driver = _DRIVER_POOL.acquire(self.data_dir)
     
     def initialize_session(self) -> Dict[str, Any]:
         """Initialize a WhatsApp session and return QR code data."""
         try:
             logger.info(f"Initializing WhatsApp session for user: {self.user_id}")
             
-            # Setup Chrome options
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument(f"--user-data-dir={self.data_dir}")
-            
-            # Simple driver setup that works with all webdriver-manager versions
-            driver_path = ChromeDriverManager().install()
-            logger.info(f"Using ChromeDriver at path: {driver_path}")
-            service = Service(executable_path=driver_path)
-            
-            # Initialize the Chrome driver
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            # Open WhatsApp Web
-            self.driver.get("https://web.whatsapp.com/")
-            
-            # Add a small delay to ensure page loads
-            time.sleep(2)
-            
-            # Create a new session record
+            # Create a new session record; it starts inactive and is flipped if already logged in
             session_data = {
                 "user_id": str(self.user_id),
                 "session_type": "whatsapp",
@@ -61,23 +316,36 @@ class WhatsAppAuthentication:
                 "session_data": {}
             }
             
-            # Save to database
-            result = self.supabase.table("sessions").insert(session_data).execute()
+            # Save to database on a helper thread so the round-trip overlaps Chrome startup
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                insert_future = executor.submit(self.supabase.table("sessions").insert(session_data).execute)
+                
+                # Start the Chrome driver
+                self._ensure_driver()
+                
+                # Open WhatsApp Web
+                self.driver.get(WHATSAPP_WEB_URL)
+                
+                # Wait for whichever renders first, the chat list or the QR code; callers re-poll
+                # check_session_status if neither shows up in time
+                state, qr_rect = self._wait_for_login_or_qr(self.qr_timeout)
+                
+                # Neither appeared in time, so fall back to the slower page-level checks
+                authenticated = state == "authenticated" or (state is None and self._is_authenticated())
+                
+                result = insert_future.result()
+            
             self.session_id = result.data[0]["id"] if result.data else None
             
             if not self.session_id:
                 logger.error("Failed to create session record")
                 return {"qr_available": False, "error": "Failed to create session record"}
             
-            # Check if already authenticated
-            if self._is_authenticated():
+            self._remember_status(str(self.session_id), SessionStatus.INACTIVE)
+            
+            if authenticated:
                 logger.info("Already authenticated in initialize_session")
-                
-                # Update session status
-                self.supabase.table("sessions").update({
-                    "status": SessionStatus.ACTIVE,
-                    "updated_at": datetime.utcnow().isoformat()
-                }).eq("id", str(self.session_id)).execute()
+                self._mark_session_active(str(self.session_id))
                 
                 return {
                     "qr_available": False,
@@ -85,51 +353,33 @@ class WhatsAppAuthentication:
                     "already_authenticated": True
                 }
             
-            # Wait for QR code
-            try:
-                qr_code_element = WebDriverWait(self.driver, 30).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "canvas"))
-                )
+            if qr_rect is None:
+                logger.warning("QR code not found within timeout period")
+                
+                # Persist the pending state so the caller can re-poll instead of blocking
+                self._update_session_data(str(self.session_id), {"qr_pending": True})
                 
-                # Extract the QR code image data directly as base64
-                qr_code_data = self.driver.execute_script("""
-                    var canvas = arguments[0];
-                    return canvas.toDataURL('image/png');
-                """, qr_code_element)
+                return {
+                    "qr_available": False,
+                    "qr_pending": True,
+                    "session_id": self.session_id
+                }
+            
+            try:
+                # Capture the QR code image as base64
+                qr_code_data = self._capture_qr_code(qr_rect)
                 
                 logger.info(f"QR code data length: {len(qr_code_data) if qr_code_data else 0}")
                 
-                # Store the QR data in the session
-                self._update_session_data(self.session_id, {"qr_code_data": qr_code_data})
+                # The caller gets the image inline, so the storage upload and session update
+                # happen in the background; status polls read the resulting qr_url
+                _QR_UPLOADER.submit(self._publish_qr_code, str(self.session_id), qr_code_data)
                 
                 return {
                     "qr_available": True,
                     "session_id": self.session_id,
                     "qr_data": qr_code_data
                 }
-            except TimeoutException:
-                logger.warning("QR code not found within timeout period")
-                
-                # Check if already logged in again (in case authentication happened during timeout)
-                if self._is_authenticated():
-                    logger.info("Authentication detected after timeout")
-                    
-                    # Update session status
-                    self.supabase.table("sessions").update({
-                        "status": SessionStatus.ACTIVE,
-                        "updated_at": datetime.utcnow().isoformat()
-                    }).eq("id", str(self.session_id)).execute()
-                    
-                    return {
-                        "qr_available": False,
-                        "session_id": self.session_id,
-                        "already_authenticated": True
-                    }
-                
-                return {
-                    "qr_available": False,
-                    "error": "QR code not found within timeout period"
-                }
             except Exception as e:
                 logger.error(f"Error extracting QR code data: {e}")
                 return {
@@ -144,157 +394,236 @@ class WhatsAppAuthentication:
     def check_session_status(self, session_id: UUID) -> Dict[str, Any]:
         """Check if the session is authenticated."""
         try:
-            # Query session from database
-            session_query = self.supabase.table("sessions").select("*").eq("id", str(session_id)).execute()
+            # Only the row's existence is needed here; session_data can carry an inline QR image
+            session_query = self.supabase.table("sessions").select("id").eq("id", str(session_id)).limit(1).execute()
             
             if not session_query.data:
                 return {"status": "not_found"}
             
-            session_data = session_query.data[0]
+            # A pooled driver usually still has WhatsApp Web open from initialize_session
+            self._ensure_driver()
             
-            # If driver is not initialized, initialize it
-            if not self.driver:
-                # Setup Chrome options
-                chrome_options = Options()
-                chrome_options.add_argument("--headless")
-                chrome_options.add_argument("--no-sandbox")
-                chrome_options.add_argument("--disable-dev-shm-usage")
-                chrome_options.add_argument(f"--user-data-dir={self.data_dir}")
-                
-                # Use a simpler approach that works with older webdriver-manager versions
-                driver_path = ChromeDriverManager().install()
-                service = Service(executable_path=driver_path)
-                
-                # Initialize the Chrome driver
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                
-                # Open WhatsApp Web and wait for it to load
-                self.driver.get("https://web.whatsapp.com/")
-                time.sleep(3)  # Give the page a moment to load
-            
-            # Refresh the page to ensure we have the latest state
+            # WhatsApp Web updates its state in-page once the phone scans the QR code,
+            # so only navigate if the tab is elsewhere (a fresh driver, or an error page)
             try:
-                self.driver.refresh()
-                time.sleep(3)  # Wait for refresh to complete
+                if not self.driver.current_url.startswith(WHATSAPP_WEB_URL):
+                    logger.info(f"Page drifted to {self.driver.current_url}, reloading WhatsApp Web")
+                    self.driver.get(WHATSAPP_WEB_URL)
             except Exception as e:
-                logger.warning(f"Error refreshing page: {e}")
+                logger.warning(f"Error checking current page: {e}")
             
-            # Check authentication status
-            if self._is_authenticated():
+            # Race the login markers against the QR code, then fall back to page-level checks
+            state, qr_rect = self._wait_for_login_or_qr(STATUS_QR_TIMEOUT)
+            if state == "authenticated" or (state is None and self._is_authenticated()):
                 logger.info(f"Session {session_id} is authenticated")
+                _stuck_polls.pop(self.data_dir, None)
                 
-                # Update session status in database
-                self.supabase.table("sessions").update({
-                    "status": SessionStatus.ACTIVE,
-                    "updated_at": datetime.utcnow().isoformat()
-                }).eq("id", str(session_id)).execute()
+                # Persist a login just completed by a QR scan now, so a crash cannot lose it;
+                # the next acquire restarts Chrome from the RAM copy
+                if self.data_dir in _qr_shown:
+                    _qr_shown.discard(self.data_dir)
+                    driver = self.driver
+                    self.driver = None
+                    _DRIVER_POOL.discard(self.data_dir, driver)
                 
-                # Try to get QR data if it exists
+                # Update session status; a logged-in session shows no more QR codes
+                self._mark_session_active(str(session_id))
+                with _published_qr_lock:
+                    _published_qr.pop(str(session_id), None)
+                
+                # Try to get QR reference if it exists
                 try:
-                    session_data = self._get_session_data(str(session_id))
-                    qr_data = session_data.get("qr_code_data")
+                    qr_url = self._get_qr_url(str(session_id))
                     
                     return {
                         "status": "authenticated",
-                        "qr_data": qr_data if qr_data else None
+                        "qr_url": qr_url
                     }
                 except Exception as e:
                     logger.warning(f"Error retrieving QR data: {e}")
                     return {"status": "authenticated"}
             
-            # Not authenticated, check for QR code
+            # Not authenticated, use the QR code if one is showing
+            if qr_rect is None:
+                logger.warning("No QR code found within timeout period")
+                
+                # Reload only once the page has shown nothing for several polls in a row
+                stuck = _stuck_polls.get(self.data_dir, 0) + 1
+                if stuck >= STUCK_POLL_LIMIT:
+                    logger.info(f"WhatsApp Web showed no QR code or chats for {stuck} polls, reloading")
+                    self.driver.get(WHATSAPP_WEB_URL)
+                    stuck = 0
+                _stuck_polls[self.data_dir] = stuck
+                return {"status": "not_authenticated"}
+            
+            _stuck_polls.pop(self.data_dir, None)
+            
             try:
-                qr_code_element = WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "canvas"))
-                )
+                qr_code_data = self._capture_qr_code(qr_rect)
                 
-                # Extract QR code if possible
-                try:
-                    qr_code_data = self.driver.execute_script("""
-                        var canvas = arguments[0];
-                        return canvas.toDataURL('image/png');
-                    """, qr_code_element)
-                    
-                    # Update session data
-                    self._update_session_data(str(session_id), {"qr_code_data": qr_code_data})
-                    
-                    # Take a screenshot for debugging
+                # Store the QR image and keep only its reference in the session
+                qr_reference = self._publish_qr_code(str(session_id), qr_code_data)
+                
+                # Take a screenshot for debugging (once per session, debug mode only)
+                if settings.app_debug and not self._qr_screenshot_saved:
                     try:
                         screenshot_path = os.path.join(self.data_dir, "qr_screenshot.png")
                         self.driver.save_screenshot(screenshot_path)
+                        self._qr_screenshot_saved = True
                         logger.info(f"Saved QR screenshot to {screenshot_path}")
                     except Exception as e:
                         logger.error(f"Error saving QR screenshot: {e}")
-                    
-                    return {
-                        "status": "not_authenticated",
-                        "qr_available": True,
-                        "qr_data": qr_code_data
-                    }
-                except Exception as e:
-                    logger.error(f"Error extracting QR code data: {e}")
+                
+                # Pollers get the short storage URL; the inline image is only sent if upload failed
+                return {
+                    "status": "not_authenticated",
+                    "qr_available": True,
+                    "qr_url": qr_reference.get("qr_url"),
+                    "qr_data": None if qr_reference.get("qr_url") else qr_code_data
+                }
             except Exception as e:
-                logger.warning(f"No QR code found: {e}")
+                logger.error(f"Error extracting QR code data: {e}")
             
             return {"status": "not_authenticated"}
         except Exception as e:
             logger.error(f"Error checking session status: {e}")
             return {"status": "error", "message": str(e)}
     
+    def wait_for_auth(self, session_id: UUID, timeout: float = 60) -> Dict[str, Any]:
+        """
+        Wait for the phone to scan the QR code using one in-page wait instead of repeated polls.
+        
+        Args:
+            session_id: ID of the session being logged in
+            timeout: Seconds to wait
+            
+        Returns:
+            The check_session_status result once logged in, or not_authenticated on timeout
+        """
+        try:
+            self._ensure_driver()
+            if not self.driver.current_url.startswith(WHATSAPP_WEB_URL):
+                self.driver.get(WHATSAPP_WEB_URL)
+            
+            # A showing QR code does not end this wait, only the chat list does
+            state, _ = self._wait_for_login_or_qr(timeout, with_qr=False)
+        except Exception as e:
+            logger.error(f"Error waiting for authentication: {e}")
+            return {"status": "error", "message": str(e)}
+        
+        if state != "authenticated":
+            return {"status": "not_authenticated"}
+        
+        # Record the login the same way a status poll does; its probe now returns at once
+        return self.check_session_status(session_id)
+    
+    def get_qr_image(self, session_id: UUID) -> Optional[bytes]:
+        """
+        Capture the QR code currently showing for a session as raw PNG bytes.
+        
+        Args:
+            session_id: ID of a session owned by this user
+            
+        Returns:
+            PNG bytes, or None if the session is unknown or no QR code is showing
+        """
+        try:
+            session_query = self.supabase.table("sessions") \
+                .select("id") \
+                .eq("id", str(session_id)) \
+                .eq("user_id", str(self.user_id)) \
+                .limit(1) \
+                .execute()
+            
+            if not session_query.data:
+                logger.warning(f"Session not found for QR image: {session_id}")
+                return None
+            
+            self._ensure_driver()
+            if not self.driver.current_url.startswith(WHATSAPP_WEB_URL):
+                self.driver.get(WHATSAPP_WEB_URL)
+            
+            state, qr_rect = self._wait_for_login_or_qr(STATUS_QR_TIMEOUT)
+            if state != "qr":
+                return None
+            
+            # CDP hands back base64 either way; decode it once here instead of in the browser
+            qr_code_data = self._capture_qr_code(qr_rect)
+            return base64.b64decode(qr_code_data.split(",", 1)[1])
+        except Exception as e:
+            logger.error(f"Error capturing QR image: {e}")
+            return None
+    
+    def _wait_for_login_or_qr(self, timeout: float, with_qr: bool = True) -> Tuple[Optional[str], Optional[Dict[str, float]]]:
+        """
+        Wait in the page, via a MutationObserver, until a login marker or the QR canvas appears.
+        
+        Args:
+            timeout: Seconds to wait
+            with_qr: Whether the QR canvas ends the wait, or only a login does
+            
+        Returns:
+            ("authenticated", None), ("qr", canvas rect), or (None, None) on timeout
+        """
+        deadline = time.monotonic() + timeout
+        interrupts = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            
+            # A script may run for at most SCRIPT_TIMEOUT, so longer waits observe in slices
+            slice_ms = int(min(remaining, SCRIPT_TIMEOUT - 1) * 1000)
+            try:
+                found = self.driver.execute_async_script(
+                    _WAIT_FOR_LOGIN_OR_QR_SCRIPT, _AUTH_SELECTOR, slice_ms, with_qr
+                )
+            except WebDriverException as e:
+                # The document was replaced mid-wait (WhatsApp reloads itself). ChromeDriver holds the
+                # next script until the new page has loaded, so observe it again without sleeping.
+                interrupts += 1
+                if interrupts >= WAIT_INTERRUPT_LIMIT:
+                    break
+                logger.debug(f"Login/QR wait interrupted (attempt {interrupts}), retrying: {e}")
+                continue
+            if found:
+                return found[0], found[1]
+        return None, None
+    
     def _is_authenticated(self) -> bool:
         """Check if the WhatsApp session is authenticated by looking for multiple indicators."""
         try:
-            # Method 1: Check for chat list or main screen elements
-            try:
-                chat_icon = self.driver.find_element(By.CSS_SELECTOR, "[data-icon='chat']")
-                if chat_icon:
-                    logger.info("Authentication detected via chat icon")
-                    return True
-            except NoSuchElementException:
-                pass
+            # Every indicator is read by one in-page probe instead of a WebDriver call each
+            probe = self.driver.execute_script(_AUTH_PROBE_SCRIPT, _AUTH_SELECTOR)
             
-            # Method 2: Check for side panel (contact list)
-            try:
-                side_panel = self.driver.find_element(By.ID, "pane-side")
-                if side_panel:
-                    logger.info("Authentication detected via side panel")
-                    return True
-            except NoSuchElementException:
-                pass
-                
-            # Method 3: Check for absence of QR code
-            try:
-                qr_code = self.driver.find_element(By.CSS_SELECTOR, "canvas")
-                # If QR code is found, not authenticated
+            # Methods 1-3: Post-login elements
+            if probe["loggedIn"]:
+                logger.info("Authentication detected via post-login element")
+                return True
+            
+            # A visible QR code means we are not authenticated
+            if probe["qr"]:
                 return False
-            except NoSuchElementException:
-                # If QR code is not found, check for other authentication indicators
-                try:
-                    # Check for profile or menu buttons that appear after login
-                    profile_button = self.driver.find_element(By.CSS_SELECTOR, "[data-icon='menu']")
-                    if profile_button:
-                        logger.info("Authentication detected via menu icon")
-                        return True
-                except NoSuchElementException:
-                    pass
             
             # Method 4: Check page title
-            if "WhatsApp" in self.driver.title and "Login" not in self.driver.title:
-                # Take a screenshot for debugging
-                try:
-                    screenshot_path = os.path.join(self.data_dir, "debug_screenshot.png")
-                    self.driver.save_screenshot(screenshot_path)
-                    logger.info(f"Saved debug screenshot to {screenshot_path}")
-                except Exception as e:
-                    logger.error(f"Error saving screenshot: {e}")
+            if "WhatsApp" in probe["title"] and "Login" not in probe["title"]:
+                # Take a screenshot for debugging (once per session, debug mode only)
+                if settings.app_debug and not self._debug_screenshot_saved:
+                    try:
+                        screenshot_path = os.path.join(self.data_dir, "debug_screenshot.png")
+                        self.driver.save_screenshot(screenshot_path)
+                        self._debug_screenshot_saved = True
+                        logger.info(f"Saved debug screenshot to {screenshot_path}")
+                    except Exception as e:
+                        logger.error(f"Error saving screenshot: {e}")
                 
                 # Check page source for indicators
-                if "WhatsApp is ready" in self.driver.page_source:
+                if probe["ready"]:
                     logger.info("Authentication detected via page content")
                     return True
                 
                 # Last resort: check if URL changed from login page
-                if "/accept" in self.driver.current_url:
+                if "/accept" in probe["url"]:
                     logger.info("Authentication detected via URL change")
                     return True
             
@@ -303,10 +632,30 @@ class WhatsAppAuthentication:
             logger.error(f"Error checking authentication status: {e}")
             return False
 
+    def _capture_qr_code(self, rect: Dict[str, float]) -> str:
+        """Capture the QR canvas as a PNG data URL using a clipped DevTools screenshot."""
+        _qr_shown.add(self.data_dir)
+        
+        # The rect comes from the login/QR probe, so no extra round-trip is spent locating the canvas
+        screenshot = self.driver.execute_cdp_cmd("Page.captureScreenshot", {
+            "format": "png",
+            "captureBeyondViewport": False,
+            "clip": {
+                "x": rect["x"],
+                "y": rect["y"],
+                "width": rect["width"],
+                "height": rect["height"],
+                "scale": 1
+            }
+        })
+        
+        # CDP already returns base64, so there is no canvas re-encode or JS string round-trip
+        return f"data:image/png;base64,{screenshot['data']}"
+
     def _get_session_data(self, session_id: str) -> Dict[str, Any]:
         """Get session data from database."""
         try:
-            session_query = self.supabase.table("sessions").select("*").eq("id", session_id).execute()
+            session_query = self.supabase.table("sessions").select("session_data").eq("id", session_id).limit(1).execute()
             
             if not session_query.data:
                 logger.warning(f"Session not found: {session_id}")
@@ -317,8 +666,84 @@ class WhatsAppAuthentication:
             logger.error(f"Error retrieving session data: {e}")
             return {}
     
+    def _get_qr_url(self, session_id: str) -> Optional[str]:
+        """Get only the stored QR code URL from the session data."""
+        try:
+            # Let Postgres project the single JSON field instead of returning the whole object
+            session_query = self.supabase.table("sessions") \
+                .select("qr_url:session_data->>qr_url") \
+                .eq("id", session_id) \
+                .limit(1) \
+                .execute()
+            
+            if not session_query.data:
+                logger.warning(f"Session not found: {session_id}")
+                return None
+            
+            return session_query.data[0].get("qr_url")
+        except Exception as e:
+            logger.error(f"Error retrieving QR code URL: {e}")
+            return None
+    
+    def _store_qr_code(self, session_id: str, qr_code_data: str) -> Dict[str, Any]:
+        """
+        Upload the QR PNG to storage and return the session data that references it.
+        
+        If the upload fails the reference has no URL; the image itself is never written into
+        session_data, where JSONB would hold it as base64 on every later read of the row.
+        """
+        try:
+            png_bytes = base64.b64decode(qr_code_data.split(",", 1)[1])
+            qr_path = f"{session_id}.png"
+            bucket = self.supabase.storage.from_(QR_BUCKET)
+            bucket.upload(qr_path, png_bytes, {"content-type": "image/png", "upsert": "true"})
+            signed = bucket.create_signed_url(qr_path, QR_URL_EXPIRES_IN)
+            return {"qr_url": signed.get("signedURL") or signed.get("signedUrl"), "qr_generated": True}
+        except Exception as e:
+            logger.error(f"Error uploading QR code to storage: {e}")
+            return {"qr_url": None, "qr_generated": True}
+    
+    def _publish_qr_code(self, session_id: str, qr_code_data: str) -> Dict[str, Any]:
+        """Upload the QR image and record its reference in the session data, unless it is unchanged."""
+        digest = hashlib.sha256(qr_code_data.encode()).hexdigest()
+        with _published_qr_lock:
+            last = _published_qr.get(session_id)
+        if last and last[0] == digest and time.monotonic() - last[2] < QR_URL_EXPIRES_IN / 2:
+            return last[1]
+        
+        qr_reference = self._store_qr_code(session_id, qr_code_data)
+        self._update_session_data(session_id, qr_reference)
+        
+        # A failed upload is retried by the next capture
+        if qr_reference.get("qr_url"):
+            with _published_qr_lock:
+                _published_qr.pop(session_id, None)
+                _published_qr[session_id] = (digest, qr_reference, time.monotonic())
+                while len(_published_qr) > PUBLISHED_QR_MAX:
+                    _published_qr.popitem(last=False)
+        return qr_reference
+    
     def _update_session_data(self, session_id: str, data: Dict[str, Any]) -> bool:
-        """Update session data in database."""
+        """Merge keys into the session data in one server-side statement."""
+        global _merge_rpc_available
+        if _merge_rpc_available:
+            try:
+                self.supabase.rpc("merge_session_data", {
+                    "p_id": session_id,
+                    "p_patch": data
+                }).execute()
+                return True
+            except Exception as e:
+                if getattr(e, "code", None) in _MISSING_FUNCTION_CODES:
+                    _merge_rpc_available = False
+                    logger.warning("merge_session_data is not installed, merging session data client-side from now on")
+                else:
+                    logger.warning(f"Server-side session data merge failed, merging client-side: {e}")
+        
+        return self._merge_session_data_client_side(session_id, data)
+    
+    def _merge_session_data_client_side(self, session_id: str, data: Dict[str, Any]) -> bool:
+        """Fallback for _update_session_data when the database function is not installed."""
         try:
             # Get current session data
             current_data = self._get_session_data(session_id)
@@ -328,8 +753,7 @@ class WhatsAppAuthentication:
             
             # Update in database
             self.supabase.table("sessions").update({
-                "session_data": merged_data,
-                "updated_at": datetime.utcnow().isoformat()
+                "session_data": merged_data
             }).eq("id", session_id).execute()
             
             return True
@@ -337,25 +761,74 @@ class WhatsAppAuthentication:
             logger.error(f"Error updating session data: {e}")
             return False
             
-    def close_session(self):
-        """Close the WhatsApp session."""
+    def close_session(self, session_id: Optional[UUID] = None):
+        """
+        Close the WhatsApp session and hand its driver back to the pool.
+        
+        The caller holds the user's driver lock, so no other request is driving the profile's
+        pooled driver while it is released here.
+        
+        Args:
+            session_id: Session to mark inactive when this instance did not open it, as with
+                        the per-request services built by the API
+        """
         logger.info(f"Closing WhatsApp session for user {self.user_id}")
         
-        if self.driver:
+        # The profile's pooled driver is released even if this instance never acquired it
+        driver = self.driver
+        self.driver = None
+        _DRIVER_POOL.release(self.data_dir, driver)
+        
+        if session_id and not self.session_id:
+            # Only the user's own sessions may be closed through their service
             try:
-                self.driver.quit()
+                result = self.supabase.table("sessions").select("id") \
+                    .eq("id", str(session_id)) \
+                    .eq("user_id", str(self.user_id)) \
+                    .limit(1) \
+                    .execute()
+                if result.data:
+                    self.session_id = str(session_id)
+                else:
+                    logger.warning(f"Session {session_id} not found for user {self.user_id}")
             except Exception as e:
-                logger.error(f"Error closing WebDriver: {e}")
-            finally:
-                self.driver = None
+                logger.error(f"Error looking up session {session_id}: {e}")
         
         if self.session_id:
-            # Update session status in database
-            try:
-                self.supabase.table("sessions").update({
-                    "status": SessionStatus.INACTIVE,
-                    "updated_at": datetime.utcnow().isoformat()
-                }).eq("id", str(self.session_id)).execute()
-                logger.info(f"Session {self.session_id} marked as inactive")
-            except Exception as e:
-                logger.error(f"Error updating session status: {e}")
\ No newline at end of file
+            self._mark_session_inactive(str(self.session_id))
+    
+    def _mark_session_active(self, session_id: str):
+        """Queue the session's active status, skipping it if it was just recorded."""
+        last = _status_writes.get(session_id)
+        if (last and last[0] == SessionStatus.ACTIVE
+                and time.monotonic() - last[1] < STATUS_WRITE_INTERVAL):
+            return
+        
+        get_session_writer(self.supabase).update(session_id, {"status": SessionStatus.ACTIVE})
+        self._remember_status(session_id, SessionStatus.ACTIVE)
+    
+    def _remember_status(self, session_id: str, status: str):
+        """Record the last status written for a session and evict expired entries."""
+        now = time.monotonic()
+        with _status_writes_lock:
+            # Re-insert so the dict stays ordered by write time
+            _status_writes.pop(session_id, None)
+            _status_writes[session_id] = (status, now)
+            
+            # Sessions that stop polling without being closed age out here
+            while True:
+                oldest_id, (_, written_at) = next(iter(_status_writes.items()))
+                if now - written_at < STATUS_WRITE_INTERVAL:
+                    break
+                del _status_writes[oldest_id]
+    
+    def _mark_session_inactive(self, session_id: str):
+        """Queue the session's inactive status; the batcher writes it in the background."""
+        get_session_writer(self.supabase).update(session_id, {"status": SessionStatus.INACTIVE})
+        
+        # A closed session needs no write suppression or QR reuse
+        with _status_writes_lock:
+            _status_writes.pop(session_id, None)
+        with _published_qr_lock:
+            _published_qr.pop(session_id, None)
+        logger.info(f"Session {session_id} marked as inactive")
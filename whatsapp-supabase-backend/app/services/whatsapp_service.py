@@ -1,44 +1,85 @@
 import os
 import re
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from uuid import UUID
-from typing import List, Dict, Any, Optional
-from datetime import datetime
-from supabase import create_client, Client  # Add this full import line
+from typing import List, Dict, Any, Optional, Tuple
+from supabase import Client
 
 from app.utils.logger import get_logger
+from app.utils.filesystem import ensure_dir
 from app.config import settings
 from app.services.whatsapp_authentication import WhatsAppAuthentication
 from app.services.file_management import FileManager
-from app.services.database_module import DatabaseManager
+from app.services.database_module import DatabaseManager, FileRow
 from app.services.chat_analysis import ChatAnalyzer
 from app.services.phone_extraction import PhoneExtractor
 from app.services.file_upload import FileUploadService
 from app.services.storage_service_helper import StorageServiceHelper
 from app.services.supabase_storage_service import SupabaseStorageService
+from app.services.supabase_pool import get_supabase
 
 logger = get_logger()
 
-# Initialize supabase client
-supabase: Client = create_client(settings.supabase_url, settings.supabase_key)  # Add this line
+# google-re2 matches in linear time; the stdlib engine handles this simple pattern when it is missing
+try:
+    import re2 as _phone_re_engine
+except ImportError:
+    _phone_re_engine = re
+
+# Phone number in a WhatsApp media folder: regular contacts (@s.whatsapp.net) or status updates (@status)
+_PHONE_RE = _phone_re_engine.compile(r'(\d+)@(?:s\.whatsapp\.net|status)')
+
+# Seconds a scraped active-chat list is reused before WhatsApp Web is scraped again
+ACTIVE_CHATS_TTL = 30
+
+# (scraped_at, active_chats) per user; services are created per request, so this lives at module level
+_active_chats_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+# Seconds a status result is reused: logins last for minutes, a pending QR should refresh quickly
+SESSION_STATUS_TTL = 30
+SESSION_PENDING_TTL = 2
+
+# (session_id, expires_at, result) per user; dropped when the user closes the session
+_session_status_cache: Dict[str, Tuple[str, float, Dict[str, Any]]] = {}
+
+# One request driving a user's Chrome at a time; concurrent status pollers wait and reuse
+# the cached result
+_session_status_locks: Dict[str, threading.Lock] = {}
+_session_status_locks_guard = threading.Lock()
+
+# Threads used to move files and write their rows; the work is disk and network bound
+ORGANIZE_WORKERS = 8
+
+# Files inserted and uploaded together while sync_files is still scanning
+SYNC_BATCH_SIZE = 100
+
+# Shared supabase client, kept under this name for existing imports
+supabase: Client = get_supabase()
 
 class WhatsAppService:
     # Rest of your implementation remains the same
     """Main WhatsApp service integrating all components."""
     
-    def __init__(self, user_id: UUID, supabase_client):
+    def __init__(self, user_id: UUID, supabase_client=None):
         """
         Initialize the WhatsApp service with all components.
         
         Args:
             user_id: UUID of the user owning this session
-            supabase_client: Initialized Supabase client for database operations
+            supabase_client: Initialized Supabase client for database operations,
+                             defaults to the shared client
         """
         self.user_id = user_id
+        supabase_client = supabase_client or get_supabase()
         self.supabase = supabase_client
         
         # Create data directory
         self.data_dir = os.path.join(settings.whatsapp_data_dir, str(user_id))
-        os.makedirs(self.data_dir, exist_ok=True)
+        ensure_dir(self.data_dir)
         
         # Initialize storage services
         supabase_storage = SupabaseStorageService(supabase_client)
@@ -64,7 +105,8 @@ class WhatsAppService:
     def initialize_session(self) -> Dict[str, Any]:
         """Initialize a WhatsApp session and return QR code data."""
         logger.info(f"Initializing WhatsApp session for user {self.user_id}")
-        result = self.auth_service.initialize_session()
+        with self._driver_lock():
+            result = self.auth_service.initialize_session()
         
         # Store references
         self.driver = self.auth_service.driver
@@ -78,8 +120,24 @@ class WhatsAppService:
     
     def check_session_status(self, session_id: UUID) -> Dict[str, Any]:
         """Check if the session is authenticated."""
-        logger.info(f"Checking session status for session {session_id}")
-        result = self.auth_service.check_session_status(session_id)
+        cached = self._cached_session_status(session_id)
+        if cached:
+            return cached
+        
+        # Concurrent polls queue here and the ones behind the first get its freshly cached
+        # answer instead of probing again
+        with self._driver_lock():
+            cached = self._cached_session_status(session_id)
+            if cached:
+                return cached
+            
+            logger.info(f"Checking session status for session {session_id}")
+            result = self.auth_service.check_session_status(session_id)
+            
+            # Frontends poll every few seconds; only settled answers are worth reusing
+            ttl = {"authenticated": SESSION_STATUS_TTL, "not_authenticated": SESSION_PENDING_TTL}.get(result.get("status"))
+            if ttl:
+                _session_status_cache[str(self.user_id)] = (str(session_id), time.monotonic() + ttl, result)
         
         # Update driver reference
         self.driver = self.auth_service.driver
@@ -90,10 +148,58 @@ class WhatsAppService:
         
         return result
     
-    def close_session(self):
-        """Close the WhatsApp session."""
+    def wait_for_auth(self, session_id: UUID, timeout: float = 60) -> Dict[str, Any]:
+        """
+        Block until the session is logged in or the timeout passes.
+        
+        Args:
+            session_id: ID of the session being logged in
+            timeout: Seconds to wait
+        """
+        logger.info(f"Waiting up to {timeout}s for session {session_id} to authenticate")
+        # Status polls queue behind the wait rather than navigating the tab it is watching
+        with self._driver_lock():
+            result = self.auth_service.wait_for_auth(session_id, timeout)
+            
+            # Status polls arriving after the login reuse this answer
+            if result.get("status") == "authenticated":
+                _session_status_cache[str(self.user_id)] = (str(session_id), time.monotonic() + SESSION_STATUS_TTL, result)
+        
+        # Update driver reference
+        self.driver = self.auth_service.driver
+        
+        # Initialize chat analyzer if driver is available
+        if self.driver and not self.chat_analyzer:
+            self.chat_analyzer = ChatAnalyzer(self.driver)
+        
+        return result
+    
+    def get_qr_image(self, session_id: UUID) -> Optional[bytes]:
+        """Return the session's current QR code as PNG bytes, or None if none is showing."""
+        logger.info(f"Capturing QR image for session {session_id}")
+        with self._driver_lock():
+            return self.auth_service.get_qr_image(session_id)
+    
+    def _driver_lock(self) -> threading.Lock:
+        """Return the lock held while a request drives the user's one Chrome profile."""
+        with _session_status_locks_guard:
+            return _session_status_locks.setdefault(str(self.user_id), threading.Lock())
+    
+    def _cached_session_status(self, session_id: UUID) -> Optional[Dict[str, Any]]:
+        """Return the user's cached status result for this session if it has not expired."""
+        cached = _session_status_cache.get(str(self.user_id))
+        if cached and cached[0] == str(session_id) and time.monotonic() < cached[1]:
+            return cached[2]
+        return None
+    
+    def close_session(self, session_id: Optional[UUID] = None):
+        """Close the WhatsApp session, marking session_id inactive when given."""
         logger.info(f"Closing session for user {self.user_id}")
-        self.auth_service.close_session()
+        # Released only once no other request of this user is mid-command on the driver
+        with self._driver_lock():
+            self.auth_service.close_session(session_id)
+        _active_chats_cache.pop(str(self.user_id), None)
+        _session_status_cache.pop(str(self.user_id), None)
         self.driver = None
         self.chat_analyzer = None
     
@@ -108,13 +214,7 @@ class WhatsAppService:
         logger.info(f"Starting file download scan for user {self.user_id}")
         
         # Get active chats for better phone number extraction
-        active_chats = {}
-        if self.chat_analyzer:
-            try:
-                active_chats = self.chat_analyzer.extract_active_chats()
-                logger.info(f"Found {len(active_chats)} active chats for context")
-            except Exception as e:
-                logger.error(f"Error extracting active chats: {str(e)}")
+        active_chats = self._get_active_chats()
         
         # Scan for files
         scan_result = self.file_manager.scan_whatsapp_files(active_chats)
@@ -139,6 +239,23 @@ class WhatsAppService:
         
         return scan_result
     
+    def _get_active_chats(self) -> Dict[str, Any]:
+        """Return the user's active chats, reusing a recent scrape when there is one."""
+        cached = _active_chats_cache.get(str(self.user_id))
+        if cached and time.monotonic() - cached[0] < ACTIVE_CHATS_TTL:
+            logger.info(f"Using {len(cached[1])} cached active chats for context")
+            return cached[1]
+        
+        active_chats = {}
+        if self.chat_analyzer:
+            try:
+                active_chats = self.chat_analyzer.extract_active_chats()
+                logger.info(f"Found {len(active_chats)} active chats for context")
+                _active_chats_cache[str(self.user_id)] = (time.monotonic(), active_chats)
+            except Exception as e:
+                logger.error(f"Error extracting active chats: {str(e)}")
+        return active_chats
+    
     def upload_files(self, file_ids: List[str] = None) -> Dict[str, Any]:
         """
         Upload WhatsApp files to storage.
@@ -154,6 +271,16 @@ class WhatsAppService:
             
         return self.file_upload_service.upload_files(self.user_id, file_ids)
     
+    async def upload_files_async(self, file_ids: List[str] = None) -> Dict[str, Any]:
+        """
+        Upload WhatsApp files to storage without blocking the event loop.
+        
+        Args:
+            file_ids: Specific file IDs to upload, or None to upload all unuploaded files
+        """
+        logger.info(f"Starting async file upload for user {self.user_id}")
+        return await self.file_upload_service.upload_files_async(self.user_id, file_ids)
+    
     def get_files(self, filter_criteria: Dict[str, Any] = None, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
         """
         Get WhatsApp files with optional filtering.
@@ -185,11 +312,21 @@ class WhatsAppService:
         """
         logger.info(f"Starting file sync for user {self.user_id}")
         
-        # First scan for new files
-        scan_result = self.download_files(auto_upload=False)
+        # Scan on this thread while a consumer inserts and uploads found files in batches
+        found_files: queue.Queue = queue.Queue()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            consumer = executor.submit(self._insert_and_upload_batches, found_files)
+            try:
+                scan_result = self.file_manager.scan_whatsapp_files(self._get_active_chats(), on_file=found_files.put)
+            finally:
+                found_files.put(None)
+            upload_result = consumer.result()
         
-        # Then upload all unuploaded files
-        upload_result = self.upload_files()
+        # Pick up files left unuploaded by earlier runs
+        leftover_result = self.upload_files()
+        for key in ("total", "uploaded", "skipped", "errors"):
+            upload_result[key] += leftover_result.get(key, 0)
+        upload_result["message"] = f"Processed {upload_result['total']} files"
         
         result = {
             "scan": {
@@ -204,6 +341,38 @@ class WhatsAppService:
         
         return result
     
+    def _insert_and_upload_batches(self, found_files: queue.Queue) -> Dict[str, Any]:
+        """
+        Insert and upload files from the scan as they arrive (runs on a worker thread).
+        
+        Args:
+            found_files: File infos from scan_whatsapp_files, ended by None
+            
+        Returns:
+            Upload statistics summed over all batches
+        """
+        upload_result = {"status": "success", "total": 0, "uploaded": 0, "skipped": 0, "errors": 0}
+        batch = []
+        
+        while True:
+            file_info = found_files.get()
+            if file_info is not None:
+                batch.append(file_info)
+            if batch and (file_info is None or len(batch) >= SYNC_BATCH_SIZE):
+                try:
+                    inserted = self.db_manager.add_files_to_database(batch)
+                    file_ids = [row["id"] for row in inserted if row.get("id")]
+                    if file_ids:
+                        batch_result = self.upload_files(file_ids)
+                        for key in ("total", "uploaded", "skipped", "errors"):
+                            upload_result[key] += batch_result.get(key, 0)
+                except Exception as e:
+                    logger.error(f"Error syncing batch of {len(batch)} files: {str(e)}")
+                    upload_result["errors"] += len(batch)
+                batch = []
+            if file_info is None:
+                return upload_result
+    
     def process_bulk_upload(self, file_paths: List[str], phone_number: str = None) -> Dict[str, Any]:
         """
         Process a bulk upload of files.
@@ -215,26 +384,31 @@ class WhatsAppService:
         Returns:
             Dictionary with process results
         """
+        if not file_paths:
+            return {"files": [], "stats": {}}
+        
         logger.info(f"Processing bulk upload of {len(file_paths)} files for user {self.user_id}")
         
         # Process files
         process_result = self.file_manager.process_bulk_upload(file_paths, phone_number)
         
         # Add to database
+        added_file_ids = []
         if process_result["files"]:
             try:
-                self.db_manager.add_files_to_database(process_result["files"])
-                logger.info(f"Added {len(process_result['files'])} files to database from bulk upload")
+                inserted = self.db_manager.add_files_to_database(process_result["files"])
+                added_file_ids = [row["id"] for row in inserted if row.get("id")]
+                logger.info(f"Added {len(added_file_ids)} files to database from bulk upload")
             except Exception as e:
                 logger.error(f"Error adding bulk files to database: {str(e)}")
                 process_result["database_error"] = str(e)
         
-        # Upload to storage
+        # Upload only the rows added here; with no IDs upload_files would sweep every unuploaded file
+        if not added_file_ids:
+            return process_result
+        
         try:
-            # Extract file IDs from newly added files
-            # This requires the database to have returned the IDs
-            # If not available, will default to uploading all unuploaded files
-            upload_result = self.upload_files()
+            upload_result = self.upload_files(added_file_ids)
             process_result["upload_result"] = upload_result
         except Exception as e:
             logger.error(f"Error uploading bulk files: {str(e)}")
@@ -251,89 +425,175 @@ class WhatsAppService:
         """
         logger.info(f"Starting phone number update for user {self.user_id}")
         
-        # Get all files with unknown phone numbers
-        files = self.db_manager.get_files({"phone_number": "unknown"}, limit=1000, offset=0)
+        # Match and update every unknown file in one server-side statement
+        try:
+            result = self.supabase.rpc("update_unknown_phone_numbers", {
+                "p_user_id": str(self.user_id)
+            }).execute()
+            updated_files = [FileRow.from_record(record) for record in result.data or []]
+        except Exception as e:
+            logger.warning(f"Server-side phone number update failed, updating row by row: {str(e)}")
+            return self._update_file_phone_numbers_per_row()
+        
+        logger.info(f"Updated phone numbers for {len(updated_files)} files server-side")
+        
+        # Only the updated rows need their files reorganized on disk
+        organize_errors = []
+        with ThreadPoolExecutor(max_workers=ORGANIZE_WORKERS) as executor:
+            organized_paths = list(executor.map(
+                lambda file: self._organize_file(file, file.phone_number, organize_errors),
+                updated_files
+            ))
+        
+        # Record the new organized paths in bulk
+        rows = [
+            self._phone_number_row(file, file.phone_number, organized_path)
+            for file, organized_path in zip(updated_files, organized_paths)
+            if organized_path
+        ]
+        organized_count = len(self.db_manager.upsert_files(rows))
+        
+        # Whatever is still unknown had no phone number in its path
+        remaining = self.db_manager.get_files({"phone_number": "unknown"}, limit=1, offset=0)
+        failed_count = remaining.get("total", 0)
         
-        updated_count = 0
-        organized_count = 0
+        result = {
+            "total_files_processed": len(updated_files) + failed_count,
+            "updated_files": len(updated_files),
+            "organized_files": organized_count,
+            "failed_updates": failed_count
+        }
+        self._log_phone_update_batch(result, organize_errors)
+        return result
+    
+    def _update_file_phone_numbers_per_row(self) -> Dict[str, Any]:
+        """Fallback for update_file_phone_numbers when the database function is not installed."""
+        total_count = 0
         failed_count = 0
-        
-        for file in files.get("files", []):
-            # Try to extract phone number from the full path
-            file_path = file.get("storage_path", "")
-            if file_path:
-                # Try both patterns for phone extraction
-                whatsapp_patterns = [
-                    r'(\d+)@s\.whatsapp\.net',  # Regular contacts
-                    r'(\d+)@status'             # Status updates
-                ]
-                
-                phone_number = None
-                for pattern in whatsapp_patterns:
-                    folder_match = re.search(pattern, file_path)
-                    if folder_match:
-                        # Extract phone number
-                        phone_number = folder_match.group(1)
-                        logger.info(f"Found phone number {phone_number} from pattern {pattern} in path: {file_path}")
-                        break
+        tasks = []
+        pending = []
+        organize_errors = []
+        
+        # Pages of unknown files stream in while earlier pages are being organized.
+        # Rows are only written once paging ends so the "unknown" offsets stay stable.
+        with ThreadPoolExecutor(max_workers=ORGANIZE_WORKERS) as executor:
+            for page in self.db_manager.iter_files({"phone_number": "unknown"}):
+                total_count += len(page)
                 
-                if phone_number:
-                    # Update the database entry
-                    updated = self.db_manager.update_file(file.get("id"), {
-                        "phone_number": phone_number
-                    })
-                    
-                    if updated:
-                        updated_count += 1
+                # Matching is cheap, so it stays serial; only the I/O is fanned out
+                page_tasks = []
+                for file in map(FileRow.from_record, page):
+                    # Try to extract phone number from the full path
+                    file_path = file.storage_path
+                    if file_path:
+                        folder_match = _PHONE_RE.search(file_path)
+                        phone_number = folder_match.group(1) if folder_match else None
                         
-                        # Reorganize the file
-                        media_type = file.get("media_type", "other")
-                        filename = file.get("filename", "")
-                        
-                        # Only reorganize if we have the necessary info
-                        if file_path and filename and media_type:
-                            try:
-                                organized_path = self.file_manager.organize_file_by_phone(
-                                    file_path, 
-                                    filename, 
-                                    phone_number, 
-                                    media_type
-                                )
-                                
-                                # Update the organized path if it changed
-                                if organized_path and organized_path != file.get("organized_path"):
-                                    self.db_manager.update_file(file.get("id"), {
-                                        "organized_path": organized_path
-                                    })
-                                    logger.info(f"Updated organized path for file {file.get('id')} to {organized_path}")
-                                    organized_count += 1
-                                else:
-                                    logger.warning(f"Could not organize or no change needed for file path: {file_path}")
-                            except Exception as e:
-                                logger.error(f"Error organizing file {file.get('id')}: {str(e)}")
-                    else:
-                        failed_count += 1
-                        logger.warning(f"Failed to update database entry for file {file.get('id')}")
-                else:
-                    failed_count += 1
-                    logger.warning(f"No phone number pattern match found in path: {file_path}")
+                        if phone_number:
+                            logger.debug(f"Found phone number {phone_number} in path: {file_path}")
+                            page_tasks.append((file, phone_number))
+                        else:
+                            failed_count += 1
+                            logger.debug(f"No phone number pattern match found in path: {file_path}")
+                
+                tasks.extend(page_tasks)
+                pending.append(executor.map(
+                    lambda task: self._organize_file(task[0], task[1], organize_errors),
+                    page_tasks
+                ))
+            
+            organized_paths = [organized_path for results in pending for organized_path in results]
+        
+        # One row per file carries both the phone number and the organized path
+        rows = [
+            self._phone_number_row(file, phone_number, organized_path)
+            for (file, phone_number), organized_path in zip(tasks, organized_paths)
+        ]
+        written = self.db_manager.upsert_files(rows)
+        
+        updated_count = len(written)
+        organized_count = sum(
+            1 for (file, _), organized_path in zip(tasks, organized_paths)
+            if organized_path and file.id in written
+        )
+        failed_count += len(tasks) - updated_count
         
-        return {
-            "total_files_processed": len(files.get("files", [])),
+        result = {
+            "total_files_processed": total_count,
             "updated_files": updated_count,
             "organized_files": organized_count,
             "failed_updates": failed_count
         }
+        self._log_phone_update_batch(result, organize_errors)
+        return result
+    
+    def _log_phone_update_batch(self, result: Dict[str, Any], organize_errors: List[str]):
+        """Log one summary line for a phone number update instead of one per file."""
+        logger.info(
+            f"Phone number update for user {self.user_id}: "
+            f"{result['updated_files']} updated, {result['organized_files']} organized, "
+            f"{result['failed_updates']} failed of {result['total_files_processed']} files"
+        )
+        if organize_errors:
+            logger.error(f"Errors organizing files for user {self.user_id}: {dict(Counter(organize_errors))}")
+    
+    def _phone_number_row(self, file: FileRow, phone_number: str, organized_path: Optional[str]) -> Dict[str, Any]:
+        """Build the upsert row that stores a file's phone number and organized path."""
+        # filename and user_id ride along because an upsert is checked as an insert first
+        return {
+            "id": file.id,
+            "user_id": str(self.user_id),
+            "filename": file.filename,
+            "phone_number": phone_number,
+            "organized_path": organized_path or file.organized_path
+        }
+    
+    def _organize_file(self, file: FileRow, phone_number: str, errors: List[str]) -> Optional[str]:
+        """
+        Move a file into its phone number folder (runs on a worker thread).
+        
+        Args:
+            file: File row to reorganize
+            phone_number: Phone number the file now belongs to
+            errors: Exception type names are appended here for the batch summary
+            
+        Returns:
+            The new organized path if it changed, None otherwise
+        """
+        file_id, file_path, filename, media_type, _, current_organized = file
+        
+        # Only reorganize if we have the necessary info
+        if not (file_path and filename and media_type):
+            return None
+        
+        try:
+            organized_path = self.file_manager.organize_file_by_phone(
+                file_path, 
+                filename, 
+                phone_number, 
+                media_type
+            )
+            
+            # Report the organized path only if it changed
+            if organized_path and organized_path != current_organized:
+                logger.debug(f"Organized file {file_id} to {organized_path}")
+                return organized_path
+            
+            logger.debug(f"Could not organize or no change needed for file path: {file_path}")
+        except Exception as e:
+            logger.debug(f"Error organizing file {file_id}: {str(e)}")
+            errors.append(type(e).__name__)
+        return None
 
 
     @classmethod
-    def create_service(cls, user_id: UUID, supabase_client) -> 'WhatsAppService':
+    def create_service(cls, user_id: UUID, supabase_client=None) -> 'WhatsAppService':
         """
         Factory method to create a WhatsApp service instance.
         
         Args:
             user_id: UUID of the user
-            supabase_client: Initialized Supabase client
+            supabase_client: Initialized Supabase client, defaults to the shared client
             
         Returns:
             WhatsAppService instance
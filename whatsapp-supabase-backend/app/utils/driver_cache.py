@@ -0,0 +1,133 @@
+import os
+import re
+import json
+import time
+import shutil
+import platform
+import functools
+import subprocess
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: installs are not serialized across processes
+    fcntl = None
+
+# Resolved ChromeDriver paths, shared by every script run on this machine
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "wa-driver")
+_META_FILE = os.path.join(_CACHE_DIR, "meta.json")
+_LOCK_FILE = os.path.join(_CACHE_DIR, "install.lock")
+
+# Seconds a resolved path is trusted before webdriver-manager is asked again. A Chrome update
+# changes the cache key, so this only bounds staleness where the version cannot be read.
+DRIVER_CACHE_TTL = 24 * 60 * 60
+
+# Browser executables asked for their version, by webdriver-manager ChromeType
+_CHROME_BINARIES = {
+    "chromium": ("chromium", "chromium-browser"),
+    None: ("google-chrome", "google-chrome-stable"),
+}
+
+def _chrome_version(chrome_type: Optional[str]) -> str:
+    """Return the installed browser version, or "unknown" if it cannot be read."""
+    # On Windows --version opens a browser window instead of printing, so the TTL covers it there
+    if platform.system() == "Windows":
+        return "unknown"
+    for name in _CHROME_BINARIES.get(chrome_type, _CHROME_BINARIES[None]):
+        binary = shutil.which(name)
+        if not binary:
+            continue
+        try:
+            output = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=5).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = re.search(r"\d+(\.\d+)+", output)
+        if match:
+            return match.group(0)
+    return "unknown"
+
+def _cache_key(chrome_type: Optional[str]) -> str:
+    """Key a cached path by platform, browser flavour and browser version."""
+    flavour = chrome_type or "google-chrome"
+    return f"{platform.system()}-{platform.machine()}-{flavour}-{_chrome_version(chrome_type)}"
+
+def _read_meta() -> dict:
+    """Load the cache file, treating a missing or corrupt one as empty."""
+    try:
+        with open(_META_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _cached_path(key: str) -> Optional[str]:
+    """Return a cached driver path that is fresh and still on disk."""
+    entry = _read_meta().get(key)
+    if not entry or time.time() - entry.get("resolved_at", 0) >= DRIVER_CACHE_TTL:
+        return None
+    path = entry.get("path")
+    return path if path and os.path.exists(path) else None
+
+@functools.lru_cache(maxsize=None)
+def get_driver_path(chrome_type: Optional[str] = None) -> str:
+    """
+    Return a ChromeDriver path, installing it through webdriver-manager at most once a day.
+
+    A warm cache costs a file read and a stat instead of webdriver-manager's version lookup
+    over HTTP. Concurrent cold starts take a file lock so only one of them downloads.
+
+    Args:
+        chrome_type: webdriver-manager ChromeType, e.g. ChromeType.CHROMIUM; None for Google Chrome
+
+    Returns:
+        Path to the chromedriver executable
+    """
+    key = _cache_key(chrome_type)
+    path = _cached_path(key)
+    if path:
+        return path
+
+    os.makedirs(_CACHE_DIR, exist_ok=True)
+    with open(_LOCK_FILE, "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+        # Another process may have installed the driver while we waited for the lock
+        path = _cached_path(key)
+        if path:
+            return path
+
+        # Imported here so a warm cache never loads webdriver-manager
+        from webdriver_manager.chrome import ChromeDriverManager
+        manager = ChromeDriverManager(chrome_type=chrome_type) if chrome_type else ChromeDriverManager()
+        path = manager.install()
+
+        meta = _read_meta()
+        meta[key] = {"path": path, "resolved_at": time.time()}
+        _write_meta(meta)
+
+    return path
+
+def _write_meta(meta: dict):
+    """Write the cache file through a temporary file so readers never see a half-written one."""
+    tmp_file = f"{_META_FILE}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_file, _META_FILE)
+
+def invalidate_driver_path(chrome_type: Optional[str] = None):
+    """
+    Forget the cached driver path, e.g. after Chrome refused to start a session with it.
+
+    Args:
+        chrome_type: The ChromeType the path was resolved for
+    """
+    get_driver_path.cache_clear()
+    if not os.path.exists(_META_FILE):
+        return
+
+    with open(_LOCK_FILE, "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        meta = _read_meta()
+        if meta.pop(_cache_key(chrome_type), None) is not None:
+            _write_meta(meta)
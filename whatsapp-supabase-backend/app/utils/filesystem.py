@@ -0,0 +1,22 @@
+import os
+import threading
+
+# Directories already created by this process, as normalized paths
+_ensured_dirs = set()
+_ensured_dirs_lock = threading.Lock()
+
+def ensure_dir(path: str) -> None:
+    """Create a directory (and parents) once per process; later calls skip the syscalls."""
+    path = os.path.normpath(path)
+    if path in _ensured_dirs:
+        return
+    os.makedirs(path, exist_ok=True)
+    
+    # makedirs created every parent too, so those skip the syscalls as well
+    with _ensured_dirs_lock:
+        while path and path not in _ensured_dirs:
+            _ensured_dirs.add(path)
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
@@ -1,19 +1,50 @@
 import sys
 import os
+import atexit
 from loguru import logger
 
 # Configure logger
 log_file_path = os.path.join("logs", "app.log")
 os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
 
+# Sinks are enqueued: callers only put the record on a queue, and a background worker does
+# the writes, rotation and compression. diagnose=False skips repr'ing every frame's variables
+# when an exception is logged. The file gets one JSON object per line for log ingestion, and
+# stderr is only colorized on a terminal.
 logger.remove()  # Remove default handler
-logger.add(sys.stderr, level="INFO")  # Add stderr handler
+logger.add(sys.stderr, level="INFO", enqueue=True, diagnose=False, colorize=sys.stderr.isatty())  # Add stderr handler
 logger.add(
     log_file_path, 
     rotation="10 MB", 
     retention="7 days", 
-    level="DEBUG"
+    compression="gz",
+    level="DEBUG",
+    enqueue=True,
+    serialize=True,
+    backtrace=False,
+    diagnose=False
 )
 
+# Drain queued records before the process exits
+atexit.register(logger.complete)
+
+# Most of the log file served by tail_log; rotation keeps the file itself near 10 MB
+LOG_TAIL_BYTES = 1024 * 1024
+
 def get_logger():
     return logger
+
+def tail_log(max_bytes: int = LOG_TAIL_BYTES) -> str:
+    """Return the end of the current log file, reading at most max_bytes from disk."""
+    try:
+        with open(log_file_path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - max_bytes))
+            data = f.read(max_bytes)
+    except FileNotFoundError:
+        return ""
+    
+    # Drop the partial first line when the read started mid-file
+    if size > max_bytes:
+        data = data.split(b"\n", 1)[-1]
+    return data.decode(errors="replace")
@@ -8,14 +8,16 @@ from uuid import UUID
 # Add the app directory to the Python path
 sys.path.insert(0, os.path.abspath('.'))
 
-# Import the WhatsApp service
-from app.services.whatsapp_service import WhatsAppService
 from app.utils.logger import get_logger
 
 logger = get_logger()
 
 def debug_qr_code():
     """Debug QR code extraction"""
+    # Imported here: the service pulls in Selenium and Supabase, which only this path needs
+    from app.services.whatsapp_service import WhatsAppService
+    from app.services.whatsapp_authentication import shutdown_drivers
+    
     logger.info("Starting QR code debugging...")
     
     # Create a test user ID
@@ -28,11 +30,18 @@ def debug_qr_code():
     logger.info("Initializing WhatsApp session...")
     result = whatsapp_service.initialize_session()
     
-    # Print the result
-    logger.info(f"Session initialization result: {json.dumps(result, indent=2)}")
+    # Print the result; the inline QR image is a data URL of tens of KB, so log its size and
+    # prefix rather than serializing all of it
+    qr_data = result.get('qr_data')
+    if qr_data:
+        logger.info(f"QR data: {len(qr_data)} chars, starting {qr_data[:40]}")
+    summary = {key: value for key, value in result.items() if key != 'qr_data'}
+    logger.info(f"Session initialization result: {json.dumps(summary, indent=2, default=str)}")
     
-    # Close the session
+    # Close the session; it only parks Chrome in the pool, so quit it and persist the profile
+    # as the app's shutdown hook would
     whatsapp_service.close_session()
+    shutdown_drivers()
     
     return result
 
@@ -3,22 +3,27 @@ Debugging script for WhatsApp session endpoint.
 This modifies the whatsapp.py API file to add detailed error logging.
 """
 import os
+import ast
 import shutil
-import re
 
 # Backup the original file
 api_file = "app/api/whatsapp.py"
 backup_file = f"{api_file}.bak"
 
 if not os.path.exists(backup_file):
-    shutil.copy2(api_file, backup_file)
+    # A hard link costs one inode operation; the file is rewritten below via os.replace,
+    # which gives api_file a new inode and leaves the backup untouched
+    try:
+        os.link(api_file, backup_file)
+    except OSError:
+        shutil.copyfile(api_file, backup_file)
     print(f"Backed up {api_file} to {backup_file}")
 else:
     print(f"Backup already exists at {backup_file}")
 
-# Read the content of the file
+# Read the file as lines; it is only joined back into one string for parsing and writing
 with open(api_file, 'r') as f:
-    content = f.read()
+    lines = f.readlines()
 
 # Add imports if they don't exist
 imports_to_add = [
@@ -27,13 +32,29 @@ imports_to_add = [
     "from fastapi.responses import JSONResponse"
 ]
 
-for imp in imports_to_add:
-    if imp not in content:
-        content = imp + "\n" + content
-        print(f"Added import: {imp}")
+# One pass over the file finds the imports already present; the rest are prepended at once
+present = set(line.strip() for line in lines)
+missing = [imp for imp in imports_to_add if imp not in present]
+lines[0:0] = [imp + "\n" for imp in missing]
+for imp in missing:
+    print(f"Added import: {imp}")
+content = "".join(lines)
 
 # Find and modify the create_session endpoint
-create_session_pattern = r"@router\.post\(\"/session\".*?\)[\s\n]+async def create_session\(.*?\):.*?try:.*?except Exception as e:(.*?)(?=\n\n|\Z)"
+def find_function_lines(source, name):
+    """Return the 0-based [start, end) line span of a top-level function, decorators included."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        # A half-edited file has no reliable span; report it instead of guessing
+        print(f"Could not parse {api_file}: {e}")
+        return None
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == name:
+            start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            return start - 1, node.end_lineno
+    return None
+
 replacement = """@router.post("/session", status_code=status.HTTP_201_CREATED)
 async def create_session(
     phone_number: str,
@@ -83,12 +104,18 @@ async def create_session(
             }
         )"""
 
-if re.search(create_session_pattern, content, re.DOTALL):
-    modified_content = re.sub(create_session_pattern, replacement, content, flags=re.DOTALL)
+# One linear parse locates the function, whatever its signature or body looks like
+span = find_function_lines(content, "create_session")
+if span:
+    lines = content.splitlines(keepends=True)
+    modified_content = "".join(lines[:span[0]]) + replacement + "\n" + "".join(lines[span[1]:])
     
-    # Write the modified content back to the file
-    with open(api_file, 'w') as f:
+    # Write the modified content to a new file and swap it in; writing in place would
+    # also change the hard-linked backup
+    tmp_file = f"{api_file}.tmp"
+    with open(tmp_file, 'w') as f:
         f.write(modified_content)
+    os.replace(tmp_file, api_file)
     
     print(f"Modified {api_file} to add detailed error logging")
 else:
@@ -23,9 +23,33 @@ CREATE TABLE IF NOT EXISTS sessions (
     session_data JSONB DEFAULT '{}'::jsonb,
     expires_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Keep sessions.updated_at on the database clock so clients don't send it
+ALTER TABLE sessions ALTER COLUMN updated_at SET DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sessions_set_updated_at ON sessions;
+CREATE TRIGGER sessions_set_updated_at
+    BEFORE UPDATE ON sessions
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+-- Merge keys into a session's data without a client-side read-modify-write
+CREATE OR REPLACE FUNCTION merge_session_data(p_id UUID, p_patch JSONB)
+RETURNS VOID AS $$
+    UPDATE sessions
+    SET session_data = COALESCE(session_data, '{}'::jsonb) || p_patch
+    WHERE id = p_id;
+$$ LANGUAGE sql;
+
 -- Files table
 CREATE TABLE IF NOT EXISTS files (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -41,6 +65,36 @@ CREATE TABLE IF NOT EXISTS files (
     updated_at TIMESTAMP WITH TIME ZONE
 );
 
+-- files.updated_at is maintained by the database like sessions.updated_at
+ALTER TABLE files ALTER COLUMN updated_at SET DEFAULT NOW();
+
+DROP TRIGGER IF EXISTS files_set_updated_at ON files;
+CREATE TRIGGER files_set_updated_at
+    BEFORE UPDATE ON files
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+-- Columns written by the WhatsApp file scanner
+ALTER TABLE files ADD COLUMN IF NOT EXISTS media_type TEXT;
+ALTER TABLE files ADD COLUMN IF NOT EXISTS organized_path TEXT;
+
+-- Fill in phone numbers for files whose path contains a WhatsApp chat folder
+CREATE OR REPLACE FUNCTION update_unknown_phone_numbers(p_user_id UUID)
+RETURNS TABLE (
+    id UUID,
+    phone_number TEXT,
+    storage_path TEXT,
+    filename TEXT,
+    media_type TEXT,
+    organized_path TEXT
+) AS $$
+    UPDATE files AS f
+    SET phone_number = substring(f.storage_path from '(\d+)@(?:s\.whatsapp\.net|status)')
+    WHERE f.user_id = p_user_id
+      AND f.phone_number = 'unknown'
+      AND f.storage_path ~ '\d+@(?:s\.whatsapp\.net|status)'
+    RETURNING f.id, f.phone_number, f.storage_path, f.filename, f.media_type, f.organized_path;
+$$ LANGUAGE sql;
+
 -- Create storage bucket for WhatsApp files
 -- Note: Run this in Supabase Dashboard SQL Editor
 SELECT create_storage_bucket('whatsapp_files', 'WhatsApp uploaded files', 'authenticated');
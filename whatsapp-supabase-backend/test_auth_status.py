@@ -2,21 +2,27 @@
 import os
 import sys
 import json
-import time
-from datetime import datetime
 from uuid import UUID
 
 # Add the app directory to the Python path
 sys.path.insert(0, os.path.abspath('.'))
 
-# Import the WhatsApp service
-from app.services.whatsapp_service import WhatsAppService
 from app.utils.logger import get_logger
 
 logger = get_logger()
 
+def summarize(result):
+    """Copy of a service result with the inline QR image replaced by its size, for logging"""
+    if result.get('qr_data'):
+        return {**result, 'qr_data': f"<{len(result['qr_data'])} chars>"}
+    return result
+
 def test_authentication():
     """Test WhatsApp authentication detection"""
+    # Deferred so importing this module stays cheap; the service loads Selenium and Supabase
+    from app.services.whatsapp_service import WhatsAppService
+    from app.services.whatsapp_authentication import shutdown_drivers
+    
     logger.info("Starting WhatsApp authentication testing...")
     
     # Create a test user ID - replace with your actual user ID from logs
@@ -30,29 +36,26 @@ def test_authentication():
     result = whatsapp_service.initialize_session()
     
     # Print the result
-    logger.info(f"Session initialization result: {json.dumps(result, default=str)}")
+    logger.info(f"Session initialization result: {json.dumps(summarize(result), default=str)}")
     
     if 'session_id' in result:
         session_id = result['session_id']
         
-        # Loop to check authentication status
-        attempts = 0
-        while attempts < 10:
-            logger.info(f"Checking authentication status (attempt {attempts+1})...")
-            status_result = whatsapp_service.check_session_status(session_id)
-            logger.info(f"Authentication status: {json.dumps(status_result, default=str)}")
-            
-            if status_result.get('status') == 'authenticated':
-                logger.info("Authentication successful!")
-                break
-            
-            logger.info("Waiting for authentication...")
-            time.sleep(5)
-            attempts += 1
+        # One in-page wait for the chat list replaces polling check_session_status
+        logger.info("Waiting for authentication...")
+        status_result = whatsapp_service.wait_for_auth(session_id, 60)
+        logger.info(f"Authentication status: {json.dumps(summarize(status_result), default=str)}")
+        
+        if status_result.get('status') == 'authenticated':
+            logger.info("Authentication successful!")
         
         # Close the session
         whatsapp_service.close_session()
     
+    # close_session only parks Chrome in the pool; quit it and persist the profile as the
+    # app's shutdown hook would
+    shutdown_drivers()
+    
     return result
 
 if __name__ == "__main__":
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 import sys
+import os
 import platform
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app.utils.driver_cache import get_driver_path
 
 def test_chromedriver():
     print(f"Testing ChromeDriver on {platform.system()} ({platform.machine()})")
@@ -16,20 +21,29 @@ def test_chromedriver():
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         
-        # Simple driver setup that works with all webdriver-manager versions
-        driver_path = ChromeDriverManager().install()
+        # Reuse one profile and disk cache across runs so only the first run pays profile creation
+        chrome_options.add_argument("--user-data-dir=/tmp/wa-chrome-profile")
+        chrome_options.add_argument("--disk-cache-dir=/tmp/wa-chrome-cache")
+        chrome_options.add_argument("--disk-cache-size=104857600")
+        chrome_options.add_argument("--homepage=about:blank")
+        chrome_options.add_argument("--no-first-run")
+        chrome_options.add_argument("--no-default-browser-check")
+        chrome_options.add_argument("--disable-features=Translate,BackForwardCache")
+        
+        # Driver path cached on disk across runs; webdriver-manager only runs on a cold cache
+        driver_path = get_driver_path()
         print(f"Using ChromeDriver at path: {driver_path}")
         service = Service(executable_path=driver_path)
         
         # Initialize the Chrome driver
         driver = webdriver.Chrome(service=service, options=chrome_options)
         
-        # Open a test page
-        driver.get("https://www.google.com")
+        # Open a local page; this checks ChromeDriver, not the network
+        driver.get("about:blank")
         
         # Check if driver works
-        title = driver.title
-        print(f"Successfully opened: {title}")
+        url = driver.current_url
+        print(f"Successfully opened: {url}")
         
         # Close the driver
         driver.quit()
@@ -11,21 +11,36 @@ import sys
 import json
 import requests
 import time
-from datetime import datetime
+import atexit
 from typing import Dict, List, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Configuration 
 API_BASE_URL = "http://localhost:8000/api"
 LOG_FILE = "whatsapp_sync_debug.log"
 
-# Set up logging
+# One keep-alive connection pool for every API call in the run
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                     max_retries=Retry(total=2, backoff_factor=0.1)))
+
+# Set up logging: one raw append-mode descriptor for the whole run, so each message is a
+# single write(2) and O_APPEND keeps lines whole even with several runs writing at once
+_LOG_FD = os.open(LOG_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+atexit.register(os.close, _LOG_FD)
+
+# [second, formatted timestamp]; strftime runs once per second rather than once per message
+_ts_cache = [0, ""]
+
 def log(message: str):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = f"{timestamp} | {message}"
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache[:] = [now, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))]
+    log_entry = f"{_ts_cache[1]} | {message}"
     print(log_entry)
     
-    with open(LOG_FILE, "a") as f:
-        f.write(log_entry + "\n")
+    os.write(_LOG_FD, (log_entry + "\n").encode("utf-8"))
 
 # Get authentication token
 def get_auth_token() -> str:
@@ -37,14 +52,16 @@ def get_auth_token() -> str:
     
     return token
 
+def auth_session(token: str):
+    """Send the token with every request made through SESSION"""
+    SESSION.headers["Authorization"] = f"Bearer {token}"
+
 # Test API connectivity
-def test_api_connection(token: str) -> bool:
+def test_api_connection() -> bool:
     """Test if the API is reachable and authentication is working"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
     try:
         log("Testing API connection...")
-        response = requests.get(f"{API_BASE_URL}/me", headers=headers)
+        response = SESSION.get(f"{API_BASE_URL}/me")
         
         if response.status_code == 200:
             user_data = response.json()
@@ -60,16 +77,14 @@ def test_api_connection(token: str) -> bool:
         return False
 
 # Check WhatsApp session status
-def check_whatsapp_session(token: str) -> Dict[str, Any]:
+def check_whatsapp_session() -> Dict[str, Any]:
     """Check if there's an active WhatsApp session"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
     try:
         # First, try to get all sessions
         log("Checking for active WhatsApp sessions...")
         
         # Create a new session if none exists
-        response = requests.post(f"{API_BASE_URL}/whatsapp/session", headers=headers)
+        response = SESSION.post(f"{API_BASE_URL}/whatsapp/session")
         
         if response.status_code == 201:
             session_data = response.json()
@@ -81,9 +96,8 @@ def check_whatsapp_session(token: str) -> Dict[str, Any]:
             # Check session status
             session_id = session_data.get('session_id')
             if session_id:
-                status_response = requests.get(
-                    f"{API_BASE_URL}/whatsapp/session/{session_id}", 
-                    headers=headers
+                status_response = SESSION.get(
+                    f"{API_BASE_URL}/whatsapp/session/{session_id}"
                 )
                 
                 if status_response.status_code == 200:
@@ -101,79 +115,23 @@ def check_whatsapp_session(token: str) -> Dict[str, Any]:
         log(f"Error checking WhatsApp session: {str(e)}")
         return {}
 
-# Check for pending files
-def check_pending_files(token: str) -> List[Dict[str, Any]]:
-    """Check for pending files that need to be synchronized"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    try:
-        log("Checking for pending files...")
-        response = requests.get(f"{API_BASE_URL}/storage/missing", headers=headers)
-        
-        if response.status_code == 200:
-            files_data = response.json()
-            
-            if isinstance(files_data, list):
-                log(f"Found {len(files_data)} pending files")
-                return files_data
-            else:
-                # Some APIs return a wrapper object
-                files = files_data.get('files', [])
-                log(f"Found {len(files)} pending files")
-                return files
-        else:
-            log(f"Failed to get pending files. Status code: {response.status_code}")
-            log(f"Response: {response.text}")
-            return []
-            
-    except requests.RequestException as e:
-        log(f"Error checking pending files: {str(e)}")
-        return []
-
-# Download files from WhatsApp
-def download_whatsapp_files(token: str) -> bool:
-    """Try to download files from WhatsApp"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
+# Check, download and sync in one request
+def run_sync_cycle() -> Dict[str, Any]:
+    """Check pending files, download from WhatsApp if none, sync and re-check, server-side"""
     try:
-        log("Attempting to download files from WhatsApp...")
-        response = requests.post(f"{API_BASE_URL}/whatsapp/download", headers=headers)
+        log("Checking for pending files, downloading and syncing...")
+        response = SESSION.post(f"{API_BASE_URL}/whatsapp/diagnose_cycle")
         
         if response.status_code == 200:
-            result = response.json()
-            files = result.get('files', [])
-            log(f"Download successful. {len(files)} files downloaded.")
-            return True
+            return response.json()
         else:
-            log(f"Failed to download files. Status code: {response.status_code}")
+            log(f"Sync cycle failed. Status code: {response.status_code}")
             log(f"Response: {response.text}")
-            return False
-            
-    except requests.RequestException as e:
-        log(f"Error downloading files: {str(e)}")
-        return False
-
-# Sync files to storage
-def sync_files(token: str) -> bool:
-    """Try to sync files to storage"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    try:
-        log("Attempting to sync files to storage...")
-        response = requests.post(f"{API_BASE_URL}/files/sync", headers=headers)
-        
-        if response.status_code == 200:
-            result = response.json()
-            log(f"Sync result: {json.dumps(result, indent=2)}")
-            return True
-        else:
-            log(f"Failed to sync files. Status code: {response.status_code}")
-            log(f"Response: {response.text}")
-            return False
+            return {}
             
     except requests.RequestException as e:
-        log(f"Error syncing files: {str(e)}")
-        return False
+        log(f"Error running sync cycle: {str(e)}")
+        return {}
 
 # Main diagnostic function
 def run_diagnostics():
@@ -181,40 +139,48 @@ def run_diagnostics():
     log("Starting WhatsApp file sync diagnostics")
     
     # Get authentication token
-    token = get_auth_token()
+    auth_session(get_auth_token())
     
     # Check API connection
-    if not test_api_connection(token):
+    if not test_api_connection():
         log("ERROR: Cannot connect to API or authentication failed.")
         log("Please check that the API is running and your token is valid.")
         return
     
     # Check WhatsApp session
-    session_info = check_whatsapp_session(token)
+    session_info = check_whatsapp_session()
     
     if not session_info:
         log("ERROR: Failed to create or check WhatsApp session.")
         log("Please check the WhatsApp session logs on the server.")
         return
     
-    # Check for pending files
-    pending_files = check_pending_files(token)
+    # Check for pending files, download and sync in one round-trip
+    state = run_sync_cycle()
     
-    if not pending_files:
+    if not state:
+        log("ERROR: Sync cycle request failed.")
+        log("Check the server logs for more details.")
+        return
+    
+    log(f"Found {state['pending_before']} pending files")
+    
+    if not state["pending_before"]:
         log("No pending files found to sync.")
         log("Attempting to download new files from WhatsApp...")
         
-        # Try to download files
-        if not download_whatsapp_files(token):
+        # Download result
+        if "download_error" in state:
+            log(f"Error downloading files: {state['download_error']}")
             log("ERROR: Failed to download files from WhatsApp.")
             log("The WhatsApp session might not be properly authenticated or there are no new files.")
             log("Check the WhatsApp web UI to see if there are any files to download.")
             return
+        log(f"Download successful. {state['downloaded']} files downloaded.")
         
-        # Check again for pending files after download
-        pending_files = check_pending_files(token)
-        
-        if not pending_files:
+        # Pending files after download
+        log(f"Found {state['pending_after_download']} pending files")
+        if not state["pending_after_download"]:
             log("Still no pending files found after download attempt.")
             log("This could mean: ")
             log("1. There are no new files in your WhatsApp")
@@ -222,19 +188,21 @@ def run_diagnostics():
             log("3. Files were downloaded but already uploaded to storage")
             return
     
-    # Try to sync files
-    if sync_files(token):
+    # Sync result
+    if "sync_error" not in state:
+        log(f"Sync result: {json.dumps(state['synced'], indent=2)}")
         log("File synchronization was successful!")
         
         # Check if there are still pending files
-        remaining_files = check_pending_files(token)
+        remaining_files = state["pending_after"]
         
         if remaining_files:
-            log(f"WARNING: There are still {len(remaining_files)} files pending after sync.")
+            log(f"WARNING: There are still {remaining_files} files pending after sync.")
             log("Some files might have failed to upload.")
         else:
             log("All files have been synchronized successfully.")
     else:
+        log(f"Error syncing files: {state['sync_error']}")
         log("ERROR: File synchronization failed.")
         log("Check the server logs for more details.")
     